@@ -1,5 +1,7 @@
+import collections
 import pygame
 import palette
+import dirty
 
 # UI constants
 TEXT_SIZE = 90
@@ -13,6 +15,48 @@ BUTTON_LINE_WIDTH = 5
 BUTTON_COLOR = palette.WHITE
 TEXT_COLOR = palette.GREEN
 
+TEXT_CACHE_SIZE = 128
+
+# fonts shared across the process, keyed by (face, size)
+fonts = {}
+
+
+def get_font(size, face=None):
+    key = (face, size)
+    if key not in fonts:
+        fonts[key] = pygame.font.Font(face, size)
+    return fonts[key]
+
+
+class TextCache:
+    def __init__(self, max_size=TEXT_CACHE_SIZE):
+        self.max_size = max_size
+        self.surfaces = collections.OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, size, color, antialias=True, face=None):
+        key = (text, size, tuple(color), antialias, face)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = get_font(size, face).render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.surfaces)}
+
+
+text_cache = TextCache()
+
 
 class Button:
     def __init__(self, pos, text, signal, x_buffer = BUTTON_BUFFER_X, 
@@ -30,9 +74,9 @@ class Button:
         self.text_color = text_color
         self.button_color = button_color
 
-        self.font = pygame.font.Font(None, self.font_size)
+        self.font = get_font(self.font_size)
         self.text_size = self.font.size(self.text)
-        self.message = self.font.render(self.text, True, self.text_color)
+        self.message = text_cache.render(self.text, self.font_size, self.text_color)
 
         self.width = self.text_size[0] + self.x_buffer
         self.height = self.text_size[1] + self.y_buffer
@@ -71,7 +115,7 @@ class Text():
         self.color = color
 
     def draw(self):
-        font = pygame.font.Font(None, TEXT_SIZE)
+        font = get_font(TEXT_SIZE)
         screen_width = self.surface.get_width()
         screen_height = self.surface.get_height()
         sizes = []
@@ -82,7 +126,7 @@ class Text():
             size = font.size(line)
             sizes.append(size)
             text_height += size[1]
-            messages.append(font.render(line, True, self.color))
+            messages.append(text_cache.render(line, TEXT_SIZE, self.color))
         
         text_height += TEXT_BUFFER * (len(self.lines) - 1)
         
@@ -98,20 +142,33 @@ class GameText:
         self.pos = pos
         self.color = color
         self.font_size = font_size
-        self.font = pygame.font.Font(None, self.font_size)
+        self.font = get_font(self.font_size)
         self.flash = flash
 
         if self.flash is not None:
             self.on_interval, self.full_interval = self.flash
             self.flash_counter = 0
 
+    def get_state(self):
+        return self.text
+
+    def set_state(self, state):
+        self.text = state
+
+    def dirty_rects(self):
+        bounds = pygame.rect.Rect(self.pos, self.font.size(self.text))
+        rects = dirty.changed(self, bounds)
+        if self.flash is not None and not rects:
+            rects = [bounds]
+        return rects
+
     def draw(self, surface=None):
         if self.flash is None or self.flash_counter <= self.on_interval:
             if surface is None:
                 window = pygame.display.get_surface()
             else:
                 window = surface
-            message = self.font.render(self.text, True, self.color)
+            message = text_cache.render(self.text, self.font_size, self.color)
             window.blit(message, self.pos)
         
         if self.flash:   
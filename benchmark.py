@@ -0,0 +1,369 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+import types
+
+WINDOW = (1300, 800)
+SNAKE_SPEED = 20
+
+# next scene for cases that end on their own; the driver starts them again
+DONE = ("done", None, None)
+
+
+def init_headless():
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+    import pygame
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_mode(WINDOW)
+
+
+class Keys:
+    # stands in for pygame.key.get_pressed() while a case runs
+    def __init__(self):
+        self.held = set()
+
+    def __getitem__(self, key):
+        return key in self.held
+
+
+# scripts set the held keys and post events before each frame
+
+def menu_script(scene, frame, rng, keys):
+    import pygame
+
+    # wander between the buttons so idle menus wake and redraw every frame
+    button = scene.buttons[frame % len(scene.buttons)]
+    pygame.event.post(pygame.event.Event(pygame.MOUSEMOTION, pos=button.rect.center,
+                                         rel=(0, 0), buttons=(0, 0, 0)))
+
+
+def pong_script(scene, frame, rng, keys):
+    import bots
+
+    keys.held.clear()
+    seats = [(scene.l_up, scene.l_down), (scene.r_up, scene.r_down)]
+    for seat, (up, down) in enumerate(seats):
+        move = bots.pong_tracker(scene.game, seat, rng)
+        if move < 0:
+            keys.held.add(up)
+        elif move > 0:
+            keys.held.add(down)
+
+
+def snake_single_script(scene, frame, rng, keys):
+    import bots
+
+    game = scene.game
+    view = types.SimpleNamespace(snakes=[game.snake], board=game.board, objects=game.objects,
+                                 out_of_bounds=game.out_of_bounds)
+    keys.held.clear()
+    direction = bots.snake_greedy(view, 0, rng)
+    if direction is not None:
+        keys.held.add(direction)
+
+
+def snake_double_script(scene, frame, rng, keys):
+    import bots
+
+    keys.held.clear()
+    for seat, controls in enumerate([scene.p1_controls, scene.p2_controls]):
+        direction = bots.snake_greedy(scene.game, seat, rng)
+        if direction is not None:
+            keys.held.add(controls[scene.directions.index(direction)])
+
+
+def no_input(scene, frame, rng, keys):
+    keys.held.clear()
+
+
+# builders make a fresh scene, already past any opening countdown
+
+def build_main_menu(rng):
+    import scenes
+    return scenes.MainMenu(None)
+
+
+def build_pong_double(rng):
+    import pong_scenes
+
+    scene = pong_scenes.PongDouble(None)
+    scene.countdown = False
+    return scene
+
+
+def build_pong_rollback(rng):
+    import pong_scenes
+    import rollback
+
+    class PongRollback(pong_scenes.PongDouble):
+        def read_moves(self):
+            # every tick mispredicts, so go back as far as the history allows
+            # and play on before reading this tick's moves
+            oldest = self.history.ring.oldest()
+            if oldest is not None:
+                self.history.rewind(oldest)
+            moves = super().read_moves()
+            self.history.record(moves)
+            return moves
+
+    scene = PongRollback(None)
+    scene.countdown = False
+    scene.history = rollback.History(scene)
+    return scene
+
+
+def build_snake_single(rng):
+    import snake_scenes
+    return snake_scenes.SnakeSingle(SNAKE_SPEED)
+
+
+def build_snake_double(rng):
+    import snake_scenes
+
+    scene = snake_scenes.SnakeDouble(SNAKE_SPEED)
+    scene.countdown = False
+    return scene
+
+
+def build_snake_party(rng):
+    import snake_scenes
+
+    scene = snake_scenes.SnakeParty((SNAKE_SPEED, ["greedy"] * 8 + ["survivor"] * 8))
+    scene.countdown = False
+    return scene
+
+
+def build_countdown(rng):
+    import scenes
+
+    background = build_snake_double(rng).surface_snapshot()
+    return scenes.Countdown((background, [["Ready..."], ["Go!"]], 30, DONE))
+
+
+recorded = {}
+
+
+def build_replay(rng):
+    import scenes
+
+    # record a round once, then replay it from the start every time; the scene
+    # drops its replay when a round ends, so keep the last one it had
+    if "replay" not in recorded:
+        scene = build_snake_double(rng)
+        keys = Keys()
+        with scripted_keys(keys):
+            for frame in range(scene.replay_size):
+                snake_double_script(scene, frame, rng, keys)
+                replay = scene.get_replay()
+                if scene.process_frame():
+                    break
+        recorded["replay"] = replay
+
+    replay, pointer = recorded["replay"]
+    return scenes.Replay((replay, pointer, DONE))
+
+
+CASES = {
+    "main_menu": (build_main_menu, menu_script),
+    "pong_double": (build_pong_double, pong_script),
+    "pong_rollback": (build_pong_rollback, pong_script),
+    "snake_single": (build_snake_single, snake_single_script),
+    "snake_double": (build_snake_double, snake_double_script),
+    "snake_party": (build_snake_party, no_input),
+    "countdown": (build_countdown, no_input),
+    "replay": (build_replay, no_input),
+}
+
+
+class scripted_keys:
+    def __init__(self, keys):
+        self.keys = keys
+
+    def __enter__(self):
+        import pygame
+
+        self.get_pressed = pygame.key.get_pressed
+        pygame.key.get_pressed = lambda: self.keys
+
+    def __exit__(self, *exc):
+        import pygame
+
+        pygame.key.get_pressed = self.get_pressed
+
+
+def percentiles(values):
+    if len(values) < 2:
+        value = values[0] if values else 0
+        return {"p50": value, "p95": value, "p99": value, "mean": value}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98],
+            "mean": statistics.mean(values)}
+
+
+def drive(name, frames, seed, measure):
+    # runs one case for frames frames, calling measure(phase) around each phase
+    import pygame
+    import scenes
+
+    build, script = CASES[name]
+    random.seed(seed)
+    rng = random.Random(seed)
+    keys = Keys()
+    pygame.event.clear()
+
+    with scripted_keys(keys):
+        scene = build(rng)
+        manager = scenes.SceneManager(scene, name)
+        manager.draw()
+        rebuilds = 0
+
+        for frame in range(frames):
+            script(scene, frame, rng, keys)
+
+            measure("start")
+            result = manager.process_frame()
+            measure("update")
+
+            # a scene that ends is started again so every frame measures the same
+            # scene; the frame it ended on is not drawn and not counted
+            if result:
+                scene = build(rng)
+                manager = scenes.SceneManager(scene, name)
+                manager.draw()
+                rebuilds += 1
+                continue
+
+            manager.draw()
+            measure("draw")
+
+    return rebuilds
+
+
+def time_case(name, frames, seed):
+    marks = {}
+    update = []
+    draw = []
+
+    def measure(phase):
+        marks[phase] = time.perf_counter()
+        if phase == "draw":
+            update.append((marks["update"] - marks["start"]) * 1000)
+            draw.append((marks["draw"] - marks["update"]) * 1000)
+
+    rebuilds = drive(name, frames, seed, measure)
+    total = [u + d for u, d in zip(update, draw)]
+    return {"frame_ms": percentiles(total), "update_ms": percentiles(update),
+            "draw_ms": percentiles(draw), "restarts": rebuilds}
+
+
+def memory_case(name, frames, seed):
+    # a second pass under tracemalloc, which is too slow to share with the timings
+    # per frame allocation is the most memory in use during the frame beyond what
+    # was in use when it started, so memory freed within the frame still counts
+    allocated = []
+    peaks = []
+    start = {}
+
+    def measure(phase):
+        if phase == "start":
+            tracemalloc.reset_peak()
+            start["frame"] = tracemalloc.get_traced_memory()[0]
+        elif phase == "draw":
+            peak = tracemalloc.get_traced_memory()[1]
+            allocated.append(peak - start["frame"])
+            peaks.append(peak)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    drive(name, frames, seed, measure)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return {"alloc_bytes_per_frame": percentiles(allocated),
+            "retained_bytes": after - before,
+            "peak_bytes": max(peaks, default=before) - before}
+
+
+def run(names, frames, seed, memory=True):
+    init_headless()
+    results = {}
+    for name in names:
+        results[name] = time_case(name, frames, seed)
+        if memory:
+            results[name].update(memory_case(name, frames, seed))
+
+    return {"frames": frames, "seed": seed, "python": platform.python_version(),
+            "platform": platform.platform(), "cases": results}
+
+
+def compare(results, baseline):
+    lines = []
+    for name, case in results["cases"].items():
+        if name not in baseline["cases"]:
+            continue
+        old = baseline["cases"][name]
+        changes = []
+        for key in ("frame_ms", "update_ms", "draw_ms"):
+            for stat in ("p50", "p95"):
+                before = old[key][stat]
+                after = case[key][stat]
+                change = (after - before) / before if before else 0
+                changes.append(f"{key[:-3]} {stat} {change:+.1%}")
+        lines.append(f"{name:<14} " + "  ".join(changes))
+    return lines
+
+
+def report(results):
+    lines = [f"{'case':<14} {'p50':>7} {'p95':>7} {'p99':>7} {'update':>7} {'draw':>7} "
+             f"{'alloc/f':>9} {'peak':>9}"]
+    for name, case in results["cases"].items():
+        frame = case["frame_ms"]
+        if "peak_bytes" in case:
+            memory = f"{case['alloc_bytes_per_frame']['p50']:9.0f} {case['peak_bytes']:9.0f}"
+        else:
+            memory = f"{'-':>9} {'-':>9}"
+        lines.append(f"{name:<14} {frame['p50']:7.3f} {frame['p95']:7.3f} {frame['p99']:7.3f} "
+                     f"{case['update_ms']['p50']:7.3f} {case['draw_ms']['p50']:7.3f} {memory}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each scene headless with scripted input.")
+    parser.add_argument("cases", nargs="*", help=f"any of {', '.join(CASES)}; all by default")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare against results saved with --json")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    results = run(args.cases or list(CASES), args.frames, args.seed, not args.no_memory)
+
+    print("times in ms, memory in bytes")
+    print("\n".join(report(results)))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\nagainst {args.baseline}")
+        print("\n".join(compare(results, baseline)))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import importlib
+import pygame
+import snake
+
+# a policy is called as policy(game, seat, rng) once per tick and returns the
+# input for its seat: a paddle move (-1, 0, 1) for Pong or a direction for Snake
+
+
+def pong_idle(game, seat, rng):
+    return 0
+
+
+def pong_random(game, seat, rng):
+    return rng.choice((-1, 0, 1))
+
+
+def pong_tracker(game, seat, rng):
+    paddle = game.left if seat == 0 else game.right
+    center = paddle.pos[1] + paddle.height // 2
+    if game.ball.y < center - paddle.speed:
+        return -1
+    elif game.ball.y > center + paddle.speed:
+        return 1
+    return 0
+
+
+DIRECTIONS = [pygame.K_UP, pygame.K_RIGHT, pygame.K_DOWN, pygame.K_LEFT]
+STEPS = {pygame.K_UP: (0, -1), pygame.K_RIGHT: (1, 0),
+         pygame.K_DOWN: (0, 1), pygame.K_LEFT: (-1, 0)}
+
+
+def snake_random(game, seat, rng):
+    return rng.choice(DIRECTIONS + [None])
+
+
+def snake_safe_moves(game, seat):
+    me = game.snakes[seat]
+    moves = []
+    for direction in DIRECTIONS:
+        if me.direction is not None and direction == snake.OPPOSITE[me.direction]:
+            continue
+
+        step = STEPS[direction]
+        pos = (me.pos[0] + step[0] * me.block_size, me.pos[1] + step[1] * me.block_size)
+        if game.out_of_bounds(pos) or game.board.cell(pos) is None:
+            continue
+        if any(other.in_tail(pos) for other in game.snakes if other is not me):
+            continue
+        moves.append((direction, pos))
+    return moves
+
+
+def snake_open_moves(game, seat):
+    # moves onto empty cells of the shared board; unlike snake_safe_moves the
+    # cost does not grow with the number of snakes
+    me = game.snakes[seat]
+    board = game.board
+    moves = []
+    for direction in DIRECTIONS:
+        if me.direction is not None and direction == snake.OPPOSITE[me.direction]:
+            continue
+
+        step = STEPS[direction]
+        pos = (me.pos[0] + step[0] * me.block_size, me.pos[1] + step[1] * me.block_size)
+        cell = board.cell(pos)
+        if cell is None or board.counts[cell] > 0:
+            continue
+        moves.append((direction, pos))
+    return moves
+
+
+def snake_greedy(game, seat, rng):
+    # head for the nearest food without running into walls or the other tail
+    return nearest_food(game, snake_safe_moves(game, seat), rng)
+
+
+def nearest_food(game, moves, rng):
+    if not moves:
+        return None
+
+    food = [obj.pos for key, obj in game.objects.items() if key.startswith("food")]
+    if not food:
+        return rng.choice(moves)[0]
+
+    def distance(move):
+        pos = move[1]
+        return min(abs(pos[0] - x) + abs(pos[1] - y) for x, y in food)
+
+    return min(moves, key=distance)[0]
+
+
+def snake_survivor(game, seat, rng):
+    moves = snake_safe_moves(game, seat)
+    if not moves:
+        return None
+    return rng.choice(moves)[0]
+
+
+def multi_greedy(game, seat, rng):
+    return nearest_food(game, snake_open_moves(game, seat), rng)
+
+
+def multi_survivor(game, seat, rng):
+    moves = snake_open_moves(game, seat)
+    if not moves:
+        return None
+    return rng.choice(moves)[0]
+
+
+POLICIES = {
+    "pong": {"idle": pong_idle, "random": pong_random, "tracker": pong_tracker},
+    "snake": {"random": snake_random, "greedy": snake_greedy, "survivor": snake_survivor},
+    "snake_multi": {"random": snake_random, "greedy": multi_greedy, "survivor": multi_survivor},
+}
+
+
+def get_policy(game, name):
+    # built-in names, or "module:function" for a policy defined elsewhere
+    if ":" in name:
+        module, attr = name.split(":", 1)
+        return getattr(importlib.import_module(module), attr)
+    return POLICIES[game][name]
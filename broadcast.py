@@ -0,0 +1,508 @@
+import argparse
+import asyncio
+import collections
+import multiprocessing
+import os
+import statistics
+import struct
+import sys
+import threading
+import time
+
+PORT = 50519
+MAGIC = b"DS"
+KEYFRAME, DELTA = range(2)
+
+# magic, kind, tick, payload length; a keyframe's payload is (scene name,
+# {name: (kind, state)}) and a delta's is ({name: (kind, state)}, [removed names])
+HEADER = struct.Struct("!2sBII")
+
+# payloads are values tagged with one byte each, so the same bytes mean the
+# same thing on any Python and reading one never runs anything
+INT = struct.Struct("!q")
+FLOAT = struct.Struct("!d")
+LENGTH = struct.Struct("!I")
+CONTAINERS = {tuple: b"t", list: b"l"}
+
+# ticks between keyframes sent to everyone, so a viewer that missed
+# something is back in step within a few seconds
+KEYFRAME_INTERVAL = 300
+# bytes queued for a viewer before it is skipped until it catches up
+MAX_BUFFERED = 256 * 1024
+CAUGHT_UP = 16 * 1024
+# seconds between sends; waking the network thread on every tick instead
+# costs the game loop milliseconds waiting for the GIL
+SEND_INTERVAL = 1 / 60
+
+
+def frame(kind, tick, payload):
+    return HEADER.pack(MAGIC, kind, tick, len(payload)) + payload
+
+
+def encode(value, out=None):
+    # None, bools, ints, floats, str, bytes, and tuples, lists and dicts of them
+    if out is None:
+        out = bytearray()
+    kind = type(value)
+    if value is None:
+        out += b"N"
+    elif kind is bool:
+        out += b"T" if value else b"F"
+    elif kind is int:
+        out += b"i" + INT.pack(value)
+    elif kind is float:
+        out += b"d" + FLOAT.pack(value)
+    elif kind is str:
+        data = value.encode()
+        out += b"s" + LENGTH.pack(len(data)) + data
+    elif kind is bytes:
+        out += b"b" + LENGTH.pack(len(value)) + value
+    elif kind in CONTAINERS:
+        out += CONTAINERS[kind] + LENGTH.pack(len(value))
+        for item in value:
+            encode(item, out)
+    elif kind is dict:
+        out += b"m" + LENGTH.pack(len(value))
+        for key, item in value.items():
+            encode(key, out)
+            encode(item, out)
+    else:
+        raise TypeError(f"can't broadcast {kind.__name__}")
+    return out
+
+
+def decode(data):
+    value, end = decode_from(data, 0)
+    if end != len(data):
+        raise ValueError("trailing bytes after payload")
+    return value
+
+
+def decode_from(data, at):
+    # the value starting at offset at, and the offset after it
+    tag = data[at:at + 1]
+    at += 1
+    if tag == b"N":
+        return None, at
+    if tag in (b"T", b"F"):
+        return tag == b"T", at
+    if tag == b"i":
+        return INT.unpack_from(data, at)[0], at + INT.size
+    if tag == b"d":
+        return FLOAT.unpack_from(data, at)[0], at + FLOAT.size
+    if tag not in (b"s", b"b", b"t", b"l", b"m"):
+        raise ValueError(f"unknown tag {tag!r}")
+
+    (length,) = LENGTH.unpack_from(data, at)
+    at += LENGTH.size
+    if tag in (b"s", b"b"):
+        if at + length > len(data):
+            raise ValueError("payload cut short")
+        raw = bytes(data[at:at + length])
+        return (raw.decode() if tag == b"s" else raw), at + length
+    if tag == b"m":
+        value = {}
+        for i in range(length):
+            key, at = decode_from(data, at)
+            value[key], at = decode_from(data, at)
+        return value, at
+
+    items = []
+    for i in range(length):
+        item, at = decode_from(data, at)
+        items.append(item)
+    return (tuple(items) if tag == b"t" else items), at
+
+
+def is_states(value):
+    # {name: (kind, state)}, as publish builds it
+    return type(value) is dict and all(
+        type(key) is str and type(entry) is tuple and len(entry) == 2 and type(entry[0]) is str
+        for key, entry in value.items())
+
+
+def is_keyframe(body):
+    return (type(body) is tuple and len(body) == 2 and type(body[0]) is str and
+            is_states(body[1]))
+
+
+def is_delta(body):
+    return (type(body) is tuple and len(body) == 2 and is_states(body[0]) and
+            type(body[1]) is list and all(type(key) is str for key in body[1]))
+
+
+class Spectator:
+    def __init__(self, writer):
+        self.writer = writer
+        # set until the viewer holds a keyframe newer than anything it missed
+        self.behind = True
+
+    def buffered(self):
+        return self.writer.transport.get_write_buffer_size()
+
+
+class Broadcaster:
+    # streams a running scene's object states to any number of viewers. The
+    # game loop only swaps in each tick's states, without waking anything up;
+    # the broadcaster's own thread picks up the newest every SEND_INTERVAL, and
+    # diffs, encodes and writes it there, once however many viewers there are.
+    def __init__(self, address):
+        self.address = address
+        self.clients = set()
+
+        # (tick, scene name, states) as last published by the game loop
+        self.latest = None
+        self.tick = 0
+        # what the viewers that are in step hold
+        self.sent = {}
+        self.sent_name = None
+        self.sent_tick = None
+        self.keyframe_tick = None
+        self.cached_keyframe = (None, None)
+        self.bytes_sent = 0
+
+        self.loop = None
+        self.server = None
+        self.stopping = None
+        self.error = None
+        self.closed = False
+        self.started = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        # waits only for the socket to be bound
+        self.thread.start()
+        self.started.wait()
+        if self.error is not None:
+            raise self.error
+        return self
+
+    # game loop side
+
+    def publish(self, name, scene):
+        # called once per tick with the running scene; only gameplay is streamed
+        self.tick += 1
+        if not self.clients or not hasattr(scene, "game"):
+            return
+
+        states = {}
+        for key, obj in scene.objects.items():
+            states[key] = (type(obj).__name__, obj.get_state())
+        self.latest = (self.tick, name, states)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.loop is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.stop)
+            self.thread.join(1)
+
+    # network side
+
+    def run(self):
+        try:
+            asyncio.run(self.serve())
+        except OSError as error:
+            self.error = error
+            self.started.set()
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopping = self.loop.create_future()
+        self.server = await asyncio.start_server(self.handle, *self.address)
+        self.started.set()
+
+        try:
+            while not self.stopping.done():
+                self.deliver()
+                await asyncio.wait([self.stopping], timeout=SEND_INTERVAL)
+        finally:
+            for client in self.clients:
+                client.writer.close()
+            self.server.close()
+
+    def stop(self):
+        if not self.stopping.done():
+            self.stopping.set_result(None)
+
+    async def handle(self, reader, writer):
+        # viewers never send anything; the read only notices them leaving
+        client = Spectator(writer)
+        self.clients.add(client)
+        if self.sent_tick is not None:
+            self.catch_up(client)
+        try:
+            while await reader.read(1024):
+                pass
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.clients.discard(client)
+            writer.close()
+
+    def deliver(self):
+        # ticks played since the last send are skipped; only the newest counts
+        if self.latest is None or self.latest[0] == self.sent_tick:
+            return
+        tick, name, states = self.latest
+
+        due = (name != self.sent_name or self.keyframe_tick is None or
+               tick - self.keyframe_tick >= KEYFRAME_INTERVAL)
+        changed = {key: entry for key, entry in states.items() if self.sent.get(key) != entry}
+        removed = [key for key in self.sent if key not in states]
+
+        self.sent = states
+        self.sent_name = name
+        self.sent_tick = tick
+
+        if due:
+            message = self.keyframe()
+            self.keyframe_tick = tick
+        elif changed or removed:
+            message = frame(DELTA, tick, encode((changed, removed)))
+        else:
+            message = None
+
+        for client in self.clients:
+            if client.behind:
+                if due:
+                    client.behind = False
+                    self.write(client, message)
+                elif client.buffered() < CAUGHT_UP:
+                    self.catch_up(client)
+            elif message is not None:
+                self.write(client, message)
+
+    def keyframe(self):
+        # everything as of the last tick sent, encoded at most once per tick
+        tick, message = self.cached_keyframe
+        if tick != self.sent_tick:
+            message = frame(KEYFRAME, self.sent_tick, encode((self.sent_name, self.sent)))
+            self.cached_keyframe = (self.sent_tick, message)
+        return message
+
+    def catch_up(self, client):
+        client.behind = False
+        self.write(client, self.keyframe())
+
+    def write(self, client, message):
+        # a viewer too slow to drain its socket is skipped until it can take a keyframe
+        if client.buffered() > MAX_BUFFERED:
+            client.behind = True
+            return
+        client.writer.write(message)
+        self.bytes_sent += len(message)
+
+
+class Viewer:
+    # the far end of a broadcast: the latest state of every object, updated
+    # as messages arrive, for a scene to copy out each frame
+    def __init__(self, address):
+        self.address = address
+        self.lock = threading.Lock()
+        self.name = None
+        self.states = {}
+        self.tick = None
+        # whether deltas apply, which takes a keyframe since anything was dropped
+        self.in_step = False
+        # bumped on every change, so readers can tell when there is nothing new
+        self.version = 0
+        self.received = 0
+
+        self.connected = False
+        self.gone = False
+        self.closed = False
+
+        self.loop = None
+        self.stopping = None
+        self.error = None
+        self.started = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        # waits only for the connection
+        self.thread.start()
+        self.started.wait()
+        if self.error is not None:
+            raise self.error
+        return self
+
+    def snapshot(self):
+        with self.lock:
+            return self.version, self.name, dict(self.states)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.loop is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.stop)
+            self.thread.join(1)
+
+    def run(self):
+        try:
+            asyncio.run(self.serve())
+        except OSError as error:
+            self.error = error
+            self.started.set()
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopping = self.loop.create_future()
+        follow = asyncio.ensure_future(self.follow())
+        await asyncio.wait([follow, self.stopping], return_when=asyncio.FIRST_COMPLETED)
+        follow.cancel()
+
+    def stop(self):
+        if not self.stopping.done():
+            self.stopping.set_result(None)
+
+    async def follow(self):
+        reader, writer = await asyncio.open_connection(*self.address)
+        self.connected = True
+        self.started.set()
+        try:
+            while True:
+                header = await reader.readexactly(HEADER.size)
+                magic, kind, tick, length = HEADER.unpack(header)
+                if magic != MAGIC:
+                    break
+                self.apply(kind, tick, await reader.readexactly(length))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.gone = True
+            writer.close()
+
+    def apply(self, kind, tick, payload):
+        # a payload that won't decode, or decodes to the wrong shape, is
+        # dropped, and deltas with it until the next keyframe puts us back in step
+        self.received += HEADER.size + len(payload)
+        try:
+            body = decode(payload)
+        except (ValueError, struct.error):
+            body = None
+        if kind == KEYFRAME and not is_keyframe(body):
+            kind = None
+        elif kind == DELTA and not is_delta(body):
+            kind = None
+
+        with self.lock:
+            if kind == KEYFRAME:
+                self.name, self.states = body
+                self.in_step = True
+            elif kind == DELTA and self.in_step:
+                changed, removed = body
+                self.states.update(changed)
+                for key in removed:
+                    self.states.pop(key, None)
+            else:
+                self.in_step = False
+                return
+            self.tick = tick
+            self.version += 1
+
+    def resync(self):
+        # for readers that can't use what they were given: ignore deltas until a keyframe
+        with self.lock:
+            self.in_step = False
+
+
+def broadcast(port=PORT):
+    return Broadcaster(("0.0.0.0", port)).start()
+
+
+def watch(address, port=PORT):
+    return Viewer((address, port)).start()
+
+
+# headless load test: a bot Pong match streamed to a crowd of viewers, which
+# run in a process of their own so they don't hold up the host
+
+
+def crowd(viewers, port, results):
+    # every viewer on one loop; sends back how many ended on each final state
+    everyone = [Viewer(("127.0.0.1", port)) for i in range(viewers)]
+
+    async def watch_all():
+        tasks = [asyncio.ensure_future(viewer.follow()) for viewer in everyone]
+        while not all(viewer.connected for viewer in everyone):
+            await asyncio.sleep(0.01)
+        results.send("ready")
+        await asyncio.gather(*tasks)
+
+    asyncio.run(watch_all())
+    finals = collections.Counter(tuple(sorted(viewer.states.items())) for viewer in everyone)
+    results.send(dict(finals))
+
+
+def load_test(viewers, ticks, fps, port):
+    import bots
+    import pygame
+    import pong_scenes
+    import random
+
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_mode((1300, 800))
+
+    scene = pong_scenes.PongDouble(None)
+    rng = random.Random(0)
+    host = broadcast(port)
+
+    results, child_end = multiprocessing.Pipe(duplex=False)
+    watchers = multiprocessing.Process(target=crowd, args=(viewers, port, child_end))
+    watchers.start()
+    results.recv()
+    while len(host.clients) < viewers:
+        time.sleep(0.01)
+
+    tick_s = 1 / fps
+    tick_ms = []
+    next_tick = time.perf_counter()
+    for tick in range(ticks):
+        # the host's whole tick, so time lost to the broadcaster's thread shows too
+        start = time.perf_counter()
+        moves = [bots.pong_tracker(scene.game, seat, rng) for seat in range(2)]
+        scene.simulate(moves)
+        host.publish("pong_double", scene)
+        tick_ms.append((time.perf_counter() - start) * 1000)
+
+        next_tick += tick_s
+        time.sleep(max(0.0, next_tick - time.perf_counter()))
+
+    # let the last tick reach everyone, then hang up on them
+    time.sleep(0.5)
+    expected = tuple(sorted(host.latest[2].items())) if host.latest else ()
+    sent = host.bytes_sent
+    host.close()
+    finals = results.recv()
+    watchers.join()
+
+    cuts = statistics.quantiles(tick_ms, n=100, method="inclusive")
+    return {"viewers": viewers, "ticks": ticks,
+            "tick_ms_p50": cuts[49], "tick_ms_p99": cuts[98],
+            "bytes_per_viewer_tick": sent / max(viewers, 1) / ticks,
+            "in_step": finals.get(expected, 0)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Stream a bot Pong match to many local viewers and check they all keep up.")
+    parser.add_argument("--viewers", type=int, default=150)
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--fps", type=int, default=60)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args(argv)
+
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    result = load_test(args.viewers, args.ticks, args.fps, args.port)
+    for key, value in result.items():
+        print(f"{key:<22}{value}")
+    if result["in_step"] != args.viewers:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
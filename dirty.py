@@ -0,0 +1,10 @@
+def changed(obj, rect):
+    # old and new bounds of obj, or nothing if it hasn't moved since it was last drawn
+    drawn = getattr(obj, "drawn_rect", None)
+    obj.drawn_rect = rect
+
+    if drawn is None:
+        return [rect]
+    if drawn == rect:
+        return []
+    return [drawn, rect]
@@ -0,0 +1,253 @@
+import multiprocessing
+import os
+import queue
+import time
+import pygame
+
+FORMATS = ("gif", "png")
+EXPORT_DIR = "exports"
+# frames waiting for the encoder; a replay holds its place while this is full
+QUEUE_SIZE = 16
+# exported frames are scaled by this, nearest neighbour so colours stay exact
+SCALE = 0.5
+
+# GIF colours are 3 bits of red, 3 of green and 2 of blue
+RED_BITS = bytes(value & 0xE0 for value in range(256))
+GREEN_BITS = bytes((value & 0xE0) >> 3 for value in range(256))
+BLUE_BITS = bytes(value >> 6 for value in range(256))
+GIF_PALETTE = bytes(channel for index in range(256) for channel in
+                    ((index >> 5) * 255 // 7, (index >> 2 & 7) * 255 // 7, (index & 3) * 255 // 3))
+
+
+def quantize(raw):
+    # RGB bytes to palette indices; each channel's bits land in their own
+    # place, so one big-int or over the whole frame puts them together
+    red = int.from_bytes(raw[0::3].translate(RED_BITS), "big")
+    green = int.from_bytes(raw[1::3].translate(GREEN_BITS), "big")
+    blue = int.from_bytes(raw[2::3].translate(BLUE_BITS), "big")
+    return (red | green | blue).to_bytes(len(raw) // 3, "big")
+
+
+def lzw(indices, min_size=8):
+    # GIF's variable width LZW; table entries are keyed by prefix code << 8 | byte
+    clear = 1 << min_size
+    end = clear + 1
+    table = {}
+    next_code = end + 1
+    size = min_size + 1
+
+    out = bytearray()
+    bits = clear
+    count = size
+
+    prefix = indices[0]
+    for byte in indices[1:]:
+        key = prefix << 8 | byte
+        code = table.get(key)
+        if code is not None:
+            prefix = code
+            continue
+
+        bits |= prefix << count
+        count += size
+        while count >= 8:
+            out.append(bits & 0xFF)
+            bits >>= 8
+            count -= 8
+
+        if next_code < 4096:
+            table[key] = next_code
+            next_code += 1
+            if next_code > 1 << size and size < 12:
+                size += 1
+        else:
+            # the table is full, so start a new one
+            bits |= clear << count
+            count += size
+            table.clear()
+            next_code = end + 1
+            size = min_size + 1
+        prefix = byte
+
+    for code in (prefix, end):
+        bits |= code << count
+        count += size
+    while count > 0:
+        out.append(bits & 0xFF)
+        bits >>= 8
+        count -= 8
+    return out
+
+
+def sub_blocks(data):
+    out = bytearray()
+    for start in range(0, len(data), 255):
+        chunk = data[start:start + 255]
+        out.append(len(chunk))
+        out += chunk
+    out.append(0)
+    return out
+
+
+class GifWriter:
+    # animated GIF that loops forever; after the first frame only the band
+    # of rows that changed is stored, drawn over the frame before it
+    def __init__(self, path, size, fps):
+        self.file = open(path, "wb")
+        self.size = size
+        self.delay = max(2, round(100 / fps))
+        self.previous = None
+
+        width, height = size
+        self.file.write(b"GIF89a" + width.to_bytes(2, "little") + height.to_bytes(2, "little") +
+                        bytes([0xF7, 0, 0]) + GIF_PALETTE)
+        self.file.write(b"\x21\xFF\x0BNETSCAPE2.0\x03\x01\x00\x00\x00")
+
+    def add(self, raw):
+        indices = quantize(raw)
+        width, height = self.size
+        top, bottom = self.changed_rows(indices, width, height)
+        self.previous = indices
+
+        # graphic control: keep the frame below, then wait delay hundredths
+        self.file.write(b"\x21\xF9\x04\x04" + self.delay.to_bytes(2, "little") + b"\x00\x00")
+        self.file.write(b"\x2C" + (0).to_bytes(2, "little") + top.to_bytes(2, "little") +
+                        width.to_bytes(2, "little") + (bottom - top).to_bytes(2, "little") +
+                        b"\x00")
+        self.file.write(b"\x08" + sub_blocks(lzw(indices[top * width:bottom * width])))
+
+    def changed_rows(self, indices, width, height):
+        previous = self.previous
+        if previous is None:
+            return 0, height
+
+        rows = [row for row in range(height)
+                if indices[row * width:(row + 1) * width] != previous[row * width:(row + 1) * width]]
+        if not rows:
+            # nothing moved; a GIF frame still needs a row of pixels
+            return 0, 1
+        return rows[0], rows[-1] + 1
+
+    def close(self):
+        self.file.write(b"\x3B")
+        self.file.close()
+
+
+class PngWriter:
+    # numbered frames for ffmpeg, e.g. ffmpeg -i frame_%05d.png replay.mp4
+    def __init__(self, path, size, fps):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.size = size
+        self.count = 0
+
+    def add(self, raw):
+        self.count += 1
+        surface = pygame.image.frombuffer(raw, self.size, "RGB")
+        pygame.image.save(surface, os.path.join(self.path, f"frame_{self.count:05d}.png"))
+
+    def close(self):
+        pass
+
+
+WRITERS = {"gif": GifWriter, "png": PngWriter}
+
+
+def encode(frames, progress, kind, path, size, fps):
+    # worker process: writes frames until None arrives, reporting each one
+    try:
+        writer = WRITERS[kind](path, size, fps)
+        count = 0
+        while True:
+            raw = frames.get()
+            if raw is None:
+                break
+            writer.add(raw)
+            count += 1
+            progress.put(("frame", count))
+        writer.close()
+        progress.put(("done", path))
+    except Exception as error:
+        progress.put(("error", f"{type(error).__name__}: {error}"))
+
+
+class Exporter:
+    # encodes frames in a separate process, so neither the encoding nor the
+    # GIL it would hold slow the game loop; offer never blocks
+    def __init__(self, kind, total, fps, source_size, directory=EXPORT_DIR, scale=SCALE):
+        self.kind = kind
+        self.total = total
+        self.size = (max(1, round(source_size[0] * scale)), max(1, round(source_size[1] * scale)))
+
+        name = time.strftime("replay-%Y%m%d-%H%M%S")
+        if kind == "gif":
+            name += ".gif"
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, name)
+
+        self.offered = 0
+        self.encoded = 0
+        self.ended = False
+        self.done = False
+        self.error = None
+
+        # spawned rather than forked, so the worker starts without the window
+        context = multiprocessing.get_context("spawn")
+        self.frames = context.Queue(QUEUE_SIZE)
+        self.progress = context.Queue()
+        self.process = context.Process(target=encode, args=(self.frames, self.progress, kind,
+                                                            self.path, self.size, fps))
+        self.process.start()
+
+    def wants_frames(self):
+        return self.offered < self.total and self.error is None
+
+    def offer(self, surface):
+        # hands over one frame; False when the queue is full and it should be offered again
+        if self.frames.full():
+            return False
+
+        scaled = pygame.transform.scale(surface, self.size)
+        try:
+            self.frames.put_nowait(pygame.image.tobytes(scaled, "RGB"))
+        except queue.Full:
+            return False
+
+        self.offered += 1
+        self.end()
+        return True
+
+    def end(self):
+        if self.offered < self.total or self.ended:
+            return
+        try:
+            self.frames.put_nowait(None)
+            self.ended = True
+        except queue.Full:
+            pass
+
+    def poll(self):
+        # picks up progress from the worker; call once a frame. Anything a
+        # worker sent before it was seen to have stopped is already waiting
+        alive = self.process.is_alive()
+        self.end()
+        while True:
+            try:
+                kind, value = self.progress.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "frame":
+                self.encoded = value
+            elif kind == "done":
+                self.done = True
+            else:
+                self.error = value
+        if not alive and not self.done and self.error is None:
+            self.error = "encoder stopped"
+
+    def status(self):
+        if self.error is not None:
+            return f"export failed: {self.error}"
+        if self.done:
+            return f"saved {self.path}"
+        return f"exporting {self.encoded}/{self.total}"
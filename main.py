@@ -1,9 +1,34 @@
+import time
+startup = [("start", time.perf_counter())]
+
+import argparse
 import pygame
 import os
+import sys
 import scenes
+import profiler
 import random
 
 if __name__ == "__main__":
+    startup.append(("imports", time.perf_counter()))
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", metavar="FILE", 
+                        help="time each frame phase, F3 shows them, samples go to FILE on exit")
+    parser.add_argument("--startup", action="store_true",
+                        help="print how long startup took, up to the first frame")
+    parser.add_argument("--host", choices=["pong", "snake"],
+                        help="host a two player game over the network")
+    parser.add_argument("--join", metavar="ADDRESS", help="join a game hosted at ADDRESS")
+    parser.add_argument("--port", type=int, default=50517)
+    parser.add_argument("--broadcast", action="store_true",
+                        help="stream every game played here to spectators")
+    parser.add_argument("--watch", metavar="ADDRESS", help="spectate games broadcast from ADDRESS")
+    parser.add_argument("--spectator-port", type=int, default=50519)
+    parser.add_argument("--record", metavar="DIR", help="save every game played to DIR")
+    parser.add_argument("--replay", metavar="FILE", help="watch a game saved with --record")
+    args = parser.parse_args()
+
     random.seed()
 
     # set game window location
@@ -15,21 +40,73 @@ if __name__ == "__main__":
     window_width = 1300
     window_height = 800
 
-    pygame.init()
+    # only what the games use; pygame.init() would also start audio and joysticks
+    pygame.display.init()
+    pygame.font.init()
+    startup.append(("pygame init", time.perf_counter()))
+
     pygame.display.set_mode((window_width, window_height))
     pygame.display.set_caption("Darkade")
+    startup.append(("window", time.perf_counter()))
 
     clock = pygame.time.Clock()
-    main_menu = scenes.MainMenu(None)
-    program = scenes.SceneManager(main_menu, "main_menu")
+    session = None
+    broadcaster = None
+    viewer = None
+    if args.watch:
+        import broadcast
+        import net_scenes
 
+        viewer = broadcast.watch(args.watch, args.spectator_port)
+        program = scenes.SceneManager(net_scenes.Spectate(viewer), "spectate")
+    elif args.replay:
+        import replays
 
-    while True:
-        result = program.process_frame()
-        if result:
-            program.change_scene(*result)
+        saved = replays.FileReplay(args.replay)
+        back = ["main_menu", scenes.MainMenu, None, True, True]
+        program = scenes.SceneManager(scenes.Replay((saved, saved.ticks, back)), "replay")
+    elif args.host or args.join:
+        import netplay
+        import net_scenes
 
+        if args.host:
+            session = netplay.host(args.host, args.port)
+        else:
+            session = netplay.join(args.join, args.port)
+        program = scenes.SceneManager(net_scenes.NetLobby(session), "lobby")
+    else:
+        main_menu = scenes.MainMenu(None)
+        program = scenes.SceneManager(main_menu, "main_menu")
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+        program.record_dir = args.record
+    if args.broadcast:
+        import broadcast
+
+        broadcaster = broadcast.broadcast(args.spectator_port)
+        program.broadcaster = broadcaster
+    if args.profile:
+        program.enable_profiler()
+    startup.append(("main menu", time.perf_counter()))
+
+    # simulation ticks at each scene's fps, drawing at the display rate
+    try:
         program.draw()
-        clock.tick(program.fps)
+        startup.append(("first frame", time.perf_counter()))
+        if args.startup:
+            print("\n".join(profiler.startup_report(startup)), file=sys.stderr)
+
+        while True:
+            program.run_frame(clock)
+    finally:
+        program.close()
+        if session is not None:
+            session.close()
+        if broadcaster is not None:
+            broadcaster.close()
+        if viewer is not None:
+            viewer.close()
+        if args.profile:
+            program.profiler.dump(args.profile)
 
 
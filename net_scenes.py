@@ -0,0 +1,242 @@
+import copy
+import pygame
+import random
+import UI
+import palette
+import pong
+import pong_scenes
+import snake
+import snake_scenes
+import scenes
+import struct
+import surfaces
+
+# both cabinets have to tick at the same rate
+NET_SNAKE_FPS = 40
+
+
+class NetLobby(scenes.Scene):
+    # waits for the other cabinet without blocking; escape gives up
+    def __init__(self, data):
+        super().__init__(data)
+        self.session = self.data
+        if self.session.seat == 0:
+            message = "waiting for a player to join..."
+        else:
+            message = f"joining {self.session.address[0]}..."
+        self.text = UI.Text([message, "press escape to cancel"], palette.WHITE)
+
+    def process_frame(self):
+        for event in pygame.event.get():
+            self.check_quit(event)
+            if event.type == pygame.KEYUP and event.key == pygame.K_ESCAPE:
+                self.session.close()
+                return ["main_menu", scenes.MainMenu, None, True, True]
+
+        if self.session.connected:
+            if self.session.game == "snake":
+                return ("snake_double", NetSnakeDouble, self.session, True)
+            return ("pong_double", NetPongDouble, self.session, True)
+
+    def draw(self):
+        self.text.draw()
+
+
+def end_screen(message):
+    surface = surfaces.borrow_window_sized()
+    surface.fill(palette.BLACK)
+    back = ["main_menu", scenes.MainMenu, None, True, True]
+    return ("countdown", scenes.Countdown, (surface, [[message]], 120, back), True)
+
+
+def connection_check(scene):
+    # the scene to go to when the match can't go on, or None
+    session = scene.session
+    if session.gone:
+        message = "connection lost"
+    elif session.desynced is not None:
+        message = "games out of sync"
+    else:
+        return None
+
+    session.close()
+    return end_screen(message)
+
+
+def report_state(scene):
+    # every so often both ends hash their state so a desync shows up
+    if scene.session.hash_due():
+        scene.save_state(scene.check)
+        scene.session.report(scene.check.digest())
+
+
+# the networked scenes go by the local scenes' names, so the countdowns and
+# replays those hand off to come back to them
+
+class NetPongDouble(pong_scenes.PongDouble):
+    # data is the session; this cabinet's paddle takes either set of keys
+    def make_game(self, width, height):
+        self.session = self.data
+        self.session.tick_ms = 1000 / self.fps
+        return pong.PongGame(width, height, self.win_score, random.Random(self.session.seed))
+
+    def setup_game(self):
+        super().setup_game()
+        self.check = self.new_snapshot()
+
+    def process_frame(self):
+        return connection_check(self) or super().process_frame()
+
+    def seed(self):
+        return self.session.seed
+
+    def read_moves(self):
+        key_list = pygame.key.get_pressed()
+        move = (self.paddle_move(key_list, self.l_up, self.l_down) or
+                self.paddle_move(key_list, self.r_up, self.r_down))
+
+        self.session.submit(move)
+        if not self.session.ready():
+            return None
+        return self.session.advance()
+
+    def simulate(self, moves):
+        ended = super().simulate(moves)
+        report_state(self)
+        return ended
+
+    def end_round(self):
+        result = super().end_round()
+        if self.game.finished():
+            self.session.close()
+        return result
+
+
+class NetSnakeDouble(snake_scenes.SnakeDouble):
+    def __init__(self, data):
+        super().__init__(data)
+        self.fps = NET_SNAKE_FPS
+        self.session.tick_ms = 1000 / self.fps
+
+    def make_game(self, width, height):
+        self.session = self.data
+        return snake.DoubleGame(width, height, self.block_size, self.food_count,
+                                rng=random.Random(self.session.seed))
+
+    def setup_game(self):
+        super().setup_game()
+        self.check = self.new_snapshot()
+
+    def process_frame(self):
+        return connection_check(self) or super().process_frame()
+
+    def seed(self):
+        return self.session.seed
+
+    def read_directions(self):
+        # inputs go over the wire as 0 for none or 1 + the direction's index
+        key_list = pygame.key.get_pressed()
+        direction = (self.read_direction(key_list, self.p1_controls) or
+                     self.read_direction(key_list, self.p2_controls))
+        if direction is None:
+            value = 0
+        else:
+            value = self.directions.index(direction) + 1
+
+        self.session.submit(value)
+        if not self.session.ready():
+            return None
+        return [None if value == 0 else self.directions[value - 1]
+                for value in self.session.advance()]
+
+    def simulate(self, directions):
+        ended = super().simulate(directions)
+        report_state(self)
+        return ended
+
+    def match(self):
+        self.session.close()
+        return super().match()
+
+
+# scenes a broadcast may come from, built on the viewer only for their objects,
+# which are copied and drawn with the host's states
+SPECTATED = {
+    "pong_double": lambda: pong_scenes.PongDouble(None),
+    "snake_single": lambda: snake_scenes.SnakeSingle(NET_SNAKE_FPS),
+    "snake_double": lambda: snake_scenes.SnakeDouble(NET_SNAKE_FPS),
+    "snake_party": lambda: snake_scenes.SnakeParty((NET_SNAKE_FPS, snake_scenes.PARTY_SLOTS)),
+}
+
+
+def state_type(state):
+    # positions may be ints or floats depending on the settings played with
+    return float if type(state) is int else type(state)
+
+
+class Spectate(scenes.Scene):
+    # data is a broadcast.Viewer; shows whatever the host is playing
+    def __init__(self, data):
+        super().__init__(data)
+        self.viewer = self.data
+        self.scene_name = None
+        self.templates = {}
+        self.version = None
+        self.text = UI.Text([f"watching {self.viewer.address[0]}...",
+                             "press escape to stop"], palette.WHITE)
+
+    def process_frame(self):
+        for event in pygame.event.get():
+            self.check_quit(event)
+            if event.type == pygame.KEYUP and event.key == pygame.K_ESCAPE:
+                self.viewer.close()
+                return ["main_menu", scenes.MainMenu, None, True, True]
+
+        if self.viewer.gone:
+            self.viewer.close()
+            return end_screen("broadcast ended")
+
+        version, name, states = self.viewer.snapshot()
+        if version == self.version:
+            return None
+        self.version = version
+
+        if name != self.scene_name:
+            self.scene_name = name
+            self.templates = SPECTATED[name]().objects if name in SPECTATED else {}
+            self.objects = {}
+
+        for key in [key for key in self.objects if key not in states]:
+            del self.objects[key]
+        for key, (kind, state) in states.items():
+            if key not in self.objects:
+                actor = self.make_actor(key, kind)
+                if actor is None:
+                    continue
+                self.objects[key] = actor
+            # a state this actor can't take drops both until the next keyframe;
+            # some set_state calls take anything, so the type is checked first
+            actor = self.objects[key]
+            try:
+                if state_type(state) is not state_type(actor.get_state()):
+                    raise TypeError(f"{kind} state can't be {type(state).__name__}")
+                actor.set_state(state)
+            except (TypeError, ValueError, IndexError, struct.error):
+                del self.objects[key]
+                self.viewer.resync()
+
+    def make_actor(self, key, kind):
+        # a copy of the template by that name, or failing that of the same kind
+        template = self.templates.get(key)
+        if template is None or type(template).__name__ != kind:
+            template = next((obj for obj in self.templates.values()
+                             if type(obj).__name__ == kind), None)
+        if template is None:
+            return None
+        return copy.copy(template)
+
+    def draw(self):
+        if not self.objects:
+            self.text.draw()
+            return
+        super().draw()
@@ -0,0 +1,444 @@
+import argparse
+import asyncio
+import math
+import os
+import random
+import struct
+import sys
+import threading
+import time
+
+PORT = 50517
+MAGIC = b"DK"
+HELLO, WELCOME, INPUTS, BYE = range(4)
+
+HEADER = struct.Struct("!2sB")
+# seed, followed by the name of the game
+WELCOME_BODY = struct.Struct("!I")
+# ack, stamp, echo, held, hash tick, state hash, first tick, count,
+# followed by count signed bytes
+INPUTS_BODY = struct.Struct("!IdddIIIB")
+
+# input delay in ticks; the delay follows the measured round trip between these
+MIN_DELAY = 2
+MAX_DELAY = 12
+# most inputs in one packet; any more wait for the peer to ack the first ones
+MAX_BATCH = 64
+
+# seconds between resends when nothing else went out, and between hellos
+RESEND_INTERVAL = 0.02
+HELLO_INTERVAL = 0.25
+PEER_TIMEOUT = 5.0
+
+# ticks between state hashes, which both ends compare to catch a desync
+HASH_INTERVAL = 30
+
+
+def now_ms():
+    return time.perf_counter() * 1000
+
+
+class Session:
+    # one end of a two player lockstep match. Each tick both seats need the
+    # other's input before either can play it, so inputs are scheduled delay
+    # ticks ahead and every packet repeats all the inputs the peer has not acked.
+    # The socket lives on its own thread with its own event loop; the game
+    # loop only touches the dicts below, so it never waits on the network.
+    def __init__(self, seat, address, game=None, seed=None):
+        self.seat = seat
+        self.address = address
+        self.game = game
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.tick_ms = 1000 / 60
+
+        self.lock = threading.Lock()
+        # inputs by tick; local ones are kept until the peer acks them
+        self.local = {}
+        self.remote = {}
+        # next tick to play, next tick to schedule a local input for,
+        # and the first ticks not yet acked by the peer and not yet received
+        self.tick = 0
+        self.scheduled = 0
+        self.acked = 0
+        self.received = 0
+        self.forgotten = 0
+
+        self.delay = MIN_DELAY
+        self.rtt = None
+        self.rttvar = 0.0
+        # the peer's latest stamp and when it arrived, echoed back for its rtt
+        self.peer_stamp = 0.0
+        self.peer_stamp_at = 0.0
+
+        # state hashes by tick from each end, dropped once compared
+        self.hashes = {}
+        self.peer_hashes = {}
+        self.latest_hash = (0, 0)
+        self.desynced = None
+
+        self.peer = None
+        self.connected = False
+        self.gone = False
+        self.closed = False
+        self.last_heard = None
+        self.last_sent = 0.0
+        self.last_hello = 0.0
+
+        self.loop = None
+        self.transport = None
+        self.stopping = None
+        self.error = None
+        self.started = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        # waits only for the socket to be bound
+        self.thread.start()
+        self.started.wait()
+        if self.error is not None:
+            raise self.error
+        return self
+
+    # game loop side
+
+    def submit(self, value):
+        # schedule this tick's local input delay ticks ahead, filling any gap
+        # left when the delay has grown
+        with self.lock:
+            target = self.tick + self.delay
+            while self.scheduled <= target:
+                self.local[self.scheduled] = value
+                self.scheduled += 1
+        if not self.closed:
+            self.loop.call_soon_threadsafe(self.send_inputs)
+
+    def ready(self):
+        with self.lock:
+            return self.tick in self.local and self.tick in self.remote
+
+    def advance(self):
+        # both inputs for the next tick, by seat; only call once ready()
+        with self.lock:
+            inputs = [None, None]
+            inputs[self.seat] = self.local[self.tick]
+            inputs[1 - self.seat] = self.remote.pop(self.tick)
+            self.tick += 1
+            self.forget()
+        return inputs
+
+    def hash_due(self):
+        return self.tick > 0 and self.tick % HASH_INTERVAL == 0
+
+    def report(self, digest):
+        # hash of the game state after the tick just played
+        with self.lock:
+            self.hashes[self.tick] = digest
+            self.latest_hash = (self.tick, digest)
+            self.compare(self.tick)
+
+    def compare(self, tick):
+        if tick not in self.hashes or tick not in self.peer_hashes:
+            return
+        if self.hashes[tick] != self.peer_hashes[tick] and self.desynced is None:
+            self.desynced = tick
+        for hashes in (self.hashes, self.peer_hashes):
+            for old in [old for old in hashes if old <= tick]:
+                del hashes[old]
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.loop is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.stop)
+            self.thread.join(1)
+
+    def forget(self):
+        # local inputs the peer has and this end has played
+        upto = min(self.acked, self.tick)
+        for tick in range(self.forgotten, upto):
+            del self.local[tick]
+        self.forgotten = max(self.forgotten, upto)
+
+    # network side
+
+    def run(self):
+        try:
+            asyncio.run(self.serve())
+        except OSError as error:
+            self.error = error
+            self.started.set()
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopping = self.loop.create_future()
+        if self.seat == 0:
+            local = self.address
+        else:
+            local = ("0.0.0.0", 0)
+        self.transport, _ = await self.loop.create_datagram_endpoint(
+            lambda: Protocol(self), local_addr=local)
+        self.started.set()
+
+        try:
+            while not self.stopping.done():
+                self.housekeeping()
+                await asyncio.wait([self.stopping], timeout=RESEND_INTERVAL)
+        finally:
+            self.transport.close()
+
+    def stop(self):
+        if self.peer is not None:
+            self.send(HEADER.pack(MAGIC, BYE))
+        if not self.stopping.done():
+            self.stopping.set_result(None)
+
+    def housekeeping(self):
+        now = now_ms()
+        if not self.connected:
+            if self.seat == 1 and now - self.last_hello > HELLO_INTERVAL * 1000:
+                self.peer = self.address
+                self.send(HEADER.pack(MAGIC, HELLO))
+                self.last_hello = now
+            return
+
+        if now - self.last_heard > PEER_TIMEOUT * 1000:
+            self.gone = True
+        # resends double as keepalives while nobody is playing
+        if now - self.last_sent > RESEND_INTERVAL * 1000:
+            self.send_inputs()
+
+    def send(self, packet):
+        self.transport.sendto(packet, self.peer)
+
+    def send_inputs(self):
+        if not self.connected or self.gone or self.stopping.done():
+            return
+
+        now = now_ms()
+        with self.lock:
+            first = self.acked
+            count = min(self.scheduled - first, MAX_BATCH)
+            values = [self.local[tick] for tick in range(first, first + count)]
+            ack = self.received
+            hash_tick, digest = self.latest_hash
+
+        echo = self.peer_stamp
+        held = now - self.peer_stamp_at if echo else 0.0
+        packet = (HEADER.pack(MAGIC, INPUTS) +
+                  INPUTS_BODY.pack(ack, now, echo, held, hash_tick, digest, first, count) +
+                  struct.pack(f"!{count}b", *values))
+        self.send(packet)
+        self.last_sent = now
+
+    def receive(self, data, address):
+        if len(data) < HEADER.size:
+            return
+        magic, kind = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            return
+
+        if kind == HELLO and self.seat == 0:
+            # the first guest to say hello gets the seat
+            if self.peer is None or self.peer == address:
+                self.peer = address
+                self.connected = True
+                self.last_heard = now_ms()
+                name = self.game.encode()
+                self.send(HEADER.pack(MAGIC, WELCOME) + WELCOME_BODY.pack(self.seed) + name)
+            return
+
+        if kind == WELCOME and self.seat == 1 and not self.connected:
+            # the host's address as it answers, which may differ from the name joined
+            self.peer = address
+            (self.seed,) = WELCOME_BODY.unpack_from(data, HEADER.size)
+            self.game = data[HEADER.size + WELCOME_BODY.size:].decode()
+            self.connected = True
+            self.last_heard = now_ms()
+            return
+
+        if address != self.peer:
+            return
+        self.last_heard = now_ms()
+
+        if kind == INPUTS and self.connected:
+            self.receive_inputs(data)
+        elif kind == BYE:
+            self.gone = True
+
+    def receive_inputs(self, data):
+        (ack, stamp, echo, held, hash_tick, digest,
+         first, count) = INPUTS_BODY.unpack_from(data, HEADER.size)
+        values = struct.unpack_from(f"!{count}b", data, HEADER.size + INPUTS_BODY.size)
+
+        now = now_ms()
+        if stamp > self.peer_stamp:
+            self.peer_stamp = stamp
+            self.peer_stamp_at = now
+        if echo:
+            self.measure(now - echo - held)
+
+        with self.lock:
+            if ack > self.acked:
+                self.acked = ack
+                self.forget()
+            for i, value in enumerate(values):
+                tick = first + i
+                if tick >= self.received:
+                    self.remote[tick] = value
+            while self.received in self.remote:
+                self.received += 1
+            if hash_tick:
+                self.peer_hashes[hash_tick] = digest
+                self.compare(hash_tick)
+
+    def measure(self, sample):
+        # smoothed round trip and its variation, as TCP keeps them
+        if self.rtt is None:
+            self.rtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.rtt - sample)
+            self.rtt = 0.875 * self.rtt + 0.125 * sample
+
+        # an input has to cross one way, with room for the jitter, before its tick
+        ticks = math.ceil((self.rtt / 2 + 2 * self.rttvar) / self.tick_ms) + 1
+        self.delay = max(MIN_DELAY, min(MAX_DELAY, ticks))
+
+
+class Protocol(asyncio.DatagramProtocol):
+    def __init__(self, session):
+        self.session = session
+
+    def datagram_received(self, data, address):
+        self.session.receive(data, address)
+
+    def error_received(self, error):
+        # the peer's port is not open yet or any more; resends carry on
+        pass
+
+
+def host(game, port=PORT, seed=None):
+    return Session(0, ("0.0.0.0", port), game, seed).start()
+
+
+def join(address, port=PORT):
+    return Session(1, (address, port)).start()
+
+
+# headless soak test: both seats in one process, talking through the proxy
+
+def soak_pong(seed):
+    import pong
+
+    game = pong.PongGame(1300, 800, rng=random.Random(seed))
+    game.point()
+
+    def play(inputs):
+        return game.step(*inputs) is not None and game.finished()
+
+    return game, play, lambda rng: rng.choice((-1, 0, 1))
+
+
+def soak_snake(seed):
+    import snake
+
+    game = snake.DoubleGame(1300, 800, 20, rng=random.Random(seed))
+    directions = [None] + list(snake.STEPS)
+
+    def play(inputs):
+        winner = game.step([directions[value] for value in inputs])
+        if winner is not None:
+            game.win(winner)
+            if game.finished():
+                return True
+            game.new_round()
+        return False
+
+    return game, play, lambda rng: rng.randrange(len(directions))
+
+
+SOAKS = {"pong": soak_pong, "snake": soak_snake}
+
+
+def soak(game, ticks, fps, port, latency, jitter, loss):
+    import netproxy
+
+    tick_ms = 1000 / fps
+    proxy = netproxy.Proxy(("127.0.0.1", port + 1), ("127.0.0.1", port),
+                           latency, jitter, loss).start()
+    sessions = [host(game, port), join("127.0.0.1", port + 1)]
+    for session in sessions:
+        session.tick_ms = tick_ms
+
+    while not all(session.connected for session in sessions):
+        time.sleep(0.01)
+
+    sides = [SOAKS[game](session.seed) for session in sessions]
+    snapshots = [side[0].new_snapshot() for side in sides]
+    rngs = [random.Random(seat) for seat in range(2)]
+    states = [[], []]
+    stalls = [0, 0]
+    done = [False, False]
+
+    start = time.perf_counter()
+    next_tick = start
+    while not all(done):
+        for seat, session in enumerate(sessions):
+            if done[seat]:
+                continue
+            match, play, policy = sides[seat]
+            session.submit(policy(rngs[seat]))
+            if not session.ready():
+                stalls[seat] += 1
+                continue
+            finished = play(session.advance())
+
+            match.save(snapshots[seat])
+            states[seat].append(snapshots[seat].digest())
+            if session.hash_due():
+                session.report(states[seat][-1])
+            done[seat] = finished or len(states[seat]) >= ticks
+            if sessions[1 - seat].gone:
+                raise SystemExit("peer timed out")
+
+        next_tick += tick_ms / 1000
+        time.sleep(max(0.0, next_tick - time.perf_counter()))
+
+    seconds = time.perf_counter() - start
+    for session in sessions:
+        session.close()
+    proxy.close()
+
+    played = min(len(states[0]), len(states[1]))
+    mismatch = next((i for i in range(played) if states[0][i] != states[1][i]), None)
+    return {"ticks": played, "seconds": seconds, "stalls": stalls,
+            "delay": [session.delay for session in sessions],
+            "rtt_ms": [session.rtt for session in sessions],
+            "dropped": proxy.dropped, "forwarded": proxy.forwarded,
+            "first_mismatch": mismatch, "desynced": [session.desynced for session in sessions]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Play two bot seats against each other through a lossy local proxy "
+                    "and check that both ends see the same game.")
+    parser.add_argument("game", choices=sorted(SOAKS))
+    parser.add_argument("--ticks", type=int, default=1200)
+    parser.add_argument("--fps", type=int, default=60)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--latency", type=float, default=40, help="one way, in ms")
+    parser.add_argument("--jitter", type=float, default=10, help="in ms")
+    parser.add_argument("--loss", type=float, default=0.05, help="chance a packet is dropped")
+    args = parser.parse_args(argv)
+
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    result = soak(args.game, args.ticks, args.fps, args.port, args.latency, args.jitter, args.loss)
+    for key, value in result.items():
+        print(f"{key:<16}{value}")
+    if result["first_mismatch"] is not None or any(t is not None for t in result["desynced"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import argparse
+import asyncio
+import random
+import threading
+
+
+class Relay(asyncio.DatagramProtocol):
+    def __init__(self, deliver):
+        self.deliver = deliver
+
+    def datagram_received(self, data, address):
+        self.deliver(data, address)
+
+    def error_received(self, error):
+        pass
+
+
+class Proxy:
+    # forwards UDP between one client and a target, delaying every packet by
+    # latency plus up to jitter milliseconds and dropping some at random, so
+    # netplay can be tried on one machine
+    def __init__(self, listen, target, latency=0, jitter=0, loss=0, seed=None):
+        self.listen = listen
+        self.target = target
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.rng = random.Random(seed)
+
+        self.client = None
+        self.forwarded = 0
+        self.dropped = 0
+
+        self.loop = None
+        self.stopping = None
+        self.started = threading.Event()
+        self.thread = None
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopping = self.loop.create_future()
+
+        outside, _ = await self.loop.create_datagram_endpoint(
+            lambda: Relay(self.from_client), local_addr=self.listen)
+        inside, _ = await self.loop.create_datagram_endpoint(
+            lambda: Relay(self.from_target), remote_addr=self.target)
+        self.outside = outside
+        self.inside = inside
+        self.started.set()
+
+        try:
+            await self.stopping
+        finally:
+            outside.close()
+            inside.close()
+
+    def from_client(self, data, address):
+        self.client = address
+        self.forward(self.inside, data, None)
+
+    def from_target(self, data, address):
+        if self.client is not None:
+            self.forward(self.outside, data, self.client)
+
+    def forward(self, transport, data, address):
+        if self.rng.random() < self.loss:
+            self.dropped += 1
+            return
+        self.forwarded += 1
+
+        delay = (self.latency + self.rng.uniform(0, self.jitter)) / 1000
+        self.loop.call_later(delay, self.send, transport, data, address)
+
+    def send(self, transport, data, address):
+        if not transport.is_closing():
+            transport.sendto(data, address)
+
+    def start(self):
+        # runs on its own thread, for use next to a game in the same process
+        self.thread = threading.Thread(target=asyncio.run, args=(self.serve(),), daemon=True)
+        self.thread.start()
+        self.started.wait()
+        return self
+
+    def close(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.stopping.set_result, None)
+            self.thread.join(1)
+
+
+def address(text):
+    host, _, port = text.rpartition(":")
+    return (host or "127.0.0.1", int(port))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lossy, laggy UDP relay for trying netplay locally.")
+    parser.add_argument("--listen", type=address, default="127.0.0.1:50518",
+                        help="host:port the joining game connects to")
+    parser.add_argument("--target", type=address, default="127.0.0.1:50517",
+                        help="host:port of the hosting game")
+    parser.add_argument("--latency", type=float, default=50, help="one way, in ms")
+    parser.add_argument("--jitter", type=float, default=10, help="in ms")
+    parser.add_argument("--loss", type=float, default=0.05, help="chance a packet is dropped")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    proxy = Proxy(args.listen, args.target, args.latency, args.jitter, args.loss, args.seed)
+    try:
+        asyncio.run(proxy.serve())
+    except KeyboardInterrupt:
+        print(f"forwarded {proxy.forwarded}, dropped {proxy.dropped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,44 @@
 import math
 import pygame
 import random
+import struct
+import zlib
+import dirty
+import palette
+import rollback
+import spatial
+
+# most wall and paddle contacts resolved for the ball in one tick
+MAX_BOUNCES = 4
+
+# ball x, y, velocity and position a tick ago; each paddle's y and y a tick ago; scores
+PONG_STATE = struct.Struct("<6d6i")
 
 class Ball:
-    def __init__(self, color):
+    def __init__(self, color, arena, rng=random, speed=15):
         self.color = color
+        self.arena = arena
+        self.rng = rng
         
-        self.speed = 15
+        self.speed = speed
         self.width = 10
         self.height = 10
 
         self.direction = [None, None]
+        self.alpha = 1.0
 
         self.reset(None)        
     
     def reset(self, serve):
-        window = pygame.display.get_surface()
-        window_width = window.get_width()
-        window_height = window.get_height()
+        window_width, window_height = self.arena
         self.x = window_width // 2 - self.width // 2
         self.y = window_height // 2 - self.height // 2
 
         self.rect = pygame.rect.Rect(self.x, self.y, self.width, self.height)
+        self.remember()
         
         if serve is None:
-            serve = random.choice(["left", "right"])
+            serve = self.rng.choice(["left", "right"])
         
         if serve == "left":
             self.direction[0] = -self.speed
@@ -34,43 +48,110 @@ class Ball:
 
         self.direction[1] = 0
     
-    def move(self):
-        self.x += self.direction[0]
-        self.y += self.direction[1]
-        self.rect = pygame.rect.Rect(self.x, self.y, self.width, self.height)
-
-    def redirect(self, new_x, angle):
-        self.x = new_x
+    def move(self, ticks=1.0):
+        self.x += self.direction[0] * ticks
+        self.y += self.direction[1] * ticks
         self.rect = pygame.rect.Rect(self.x, self.y, self.width, self.height)
 
+    def redirect(self, angle):
         x_vel = self.speed * math.cos(angle)
         y_vel = self.speed * math.sin(angle)
         self.direction = [x_vel, y_vel]
+
+    def sweep_rect(self, ticks):
+        # everything the ball passes over in the next ticks ticks
+        x = self.x + self.direction[0] * ticks
+        y = self.y + self.direction[1] * ticks
+        left = min(self.x, x)
+        top = min(self.y, y)
+        return spatial.covering_rect(left, top, abs(x - self.x) + self.width, 
+                                     abs(y - self.y) + self.height)
+
+    def time_to_line(self, y, limit):
+        # ticks until the ball's y reaches y, if that is less than limit
+        if self.direction[1] == 0:
+            return None
+        ticks = (y - self.y) / self.direction[1]
+        if 0 <= ticks < limit:
+            return ticks
+        return None
+
+    def time_to_rect(self, rect, limit):
+        # ticks until the ball first overlaps rect, if that is less than limit;
+        # 0 if it already does
+        entry = 0.0
+        leave = limit
+        axes = ((self.x, self.direction[0], rect.left - self.width, rect.right),
+                (self.y, self.direction[1], rect.top - self.height, rect.bottom))
+        for pos, vel, low, high in axes:
+            if vel == 0:
+                if pos <= low or pos >= high:
+                    return None
+                continue
+
+            near = (low - pos) / vel
+            far = (high - pos) / vel
+            if near > far:
+                near, far = far, near
+            entry = max(entry, near)
+            leave = min(leave, far)
+            if entry >= leave:
+                return None
+        return entry
+
+    def get_state(self):
+        return (self.x, self.y, self.direction[0], self.direction[1])
+
+    def set_state(self, state):
+        self.x, self.y = state[0], state[1]
+        self.direction = [state[2], state[3]]
+        self.rect = pygame.rect.Rect(self.x, self.y, self.width, self.height)
+        self.remember()
+
+    def remember(self):
+        # position at the start of a tick, for drawing between ticks
+        self.previous = (self.x, self.y)
+
+    def interpolate(self, alpha):
+        self.alpha = alpha
+
+    def draw_pos(self):
+        x = self.previous[0] + (self.x - self.previous[0]) * self.alpha
+        y = self.previous[1] + (self.y - self.previous[1]) * self.alpha
+        return (round(x), round(y))
+
+    def dirty_rects(self):
+        # the ball is drawn as a circle centred on (x, y), not at rect
+        radius = self.width // 2
+        x, y = self.draw_pos()
+        bounds = pygame.rect.Rect(x - radius, y - radius, self.width + 1, self.height + 1)
+        return dirty.changed(self, bounds)
     
     def draw(self, surface=None):
         if surface is None:
             window = pygame.display.get_surface()
         else:
             window = surface
-        pos = (round(self.x), round(self.y))
-        pygame.draw.circle(window, self.color, pos, self.width // 2)
+        pygame.draw.circle(window, self.color, self.draw_pos(), self.width // 2)
     
 
 class Paddle:
-    def __init__(self, pos, color, width, height):
+    def __init__(self, pos, color, width, height, arena_height):
         self.pos = pos
+        self.arena_height = arena_height
         self.color = color
         self.speed = 10
 
         self.height = height
         self.width = width
+        self.alpha = 1.0
 
         self.reset()
         
     def reset(self):
-        window_height = pygame.display.get_surface().get_height()
-        self.pos[1] = window_height // 2 - self.height // 2
+        self.pos[1] = self.arena_height // 2 - self.height // 2
         self.rect = pygame.rect.Rect(self.pos[0], self.pos[1], self.width, self.height) 
+        self.remember()
 
     def up(self):
         self.pos[1] -= self.speed
@@ -80,7 +161,8 @@ class Paddle:
         self.pos[1] += self.speed
         self.rect = pygame.rect.Rect(self.pos[0], self.pos[1], self.width, self.height) 
 
-    def bounce(self, ball_x, ball_y, side):
+    def bounce(self, ball_y, side):
+        # the angle the ball leaves at, steeper the further from the centre it hits
         max_angle = 1.2
         center = self.height // 2
         dist = ball_y - self.pos[1]
@@ -90,32 +172,234 @@ class Paddle:
         if angle > max_angle or angle < -max_angle:
             angle = math.copysign(max_angle, angle)
         
-        if side == "left":
-            new_x = self.pos[0] + self.width + 1
-
-        elif side == "right":
-            new_x = self.pos[0] - self.width + 1
+        if side == "right":
             angle = math.pi - angle
 
+        return angle
+
+    def get_state(self):
+        return self.pos[1]
+
+    def set_state(self, state):
+        self.pos = [self.pos[0], state]
+        self.rect = pygame.rect.Rect(self.pos[0], self.pos[1], self.width, self.height)
+        self.remember()
+
+    def remember(self):
+        self.previous = self.pos[1]
 
-        return new_x, angle
+    def interpolate(self, alpha):
+        self.alpha = alpha
+
+    def draw_rect(self):
+        y = self.previous + (self.pos[1] - self.previous) * self.alpha
+        return pygame.rect.Rect(self.pos[0], round(y), self.width, self.height)
+
+    def dirty_rects(self):
+        return dirty.changed(self, self.draw_rect())
     
     def draw(self, surface=None):
         if surface is None:
             window = pygame.display.get_surface()
         else:
             window = surface
-        pygame.draw.rect(window, self.color, self.rect)
+        pygame.draw.rect(window, self.color, self.draw_rect())
 
 class Wall:
-    def __init__(self, y, color):
+    def __init__(self, y, color, width):
         self.y = y
         self.color = color
-        self.rect = pygame.rect.Rect(0, y, pygame.display.get_surface().get_width(), 5)
+        self.rect = pygame.rect.Rect(0, y, width, 5)
+
+    def get_state(self):
+        return self.y
+
+    def set_state(self, state):
+        self.y = state
+        self.rect.y = state
+
+    def dirty_rects(self):
+        return dirty.changed(self, self.rect.copy())
     
     def draw(self, surface=None):
         if surface is None:
             window = pygame.display.get_surface()
         else:
             window = surface
-        pygame.draw.rect(window, self.color, self.rect)
\ No newline at end of file
+        pygame.draw.rect(window, self.color, self.rect)
+
+class PongGame:
+    # pure game logic; moves are -1 (up), 0 or 1 (down) for each paddle
+    def __init__(self, width, height, win_score=10, rng=None, ball_speed=15):
+        self.width = width
+        self.height = height
+        self.win_score = win_score
+
+        self.score_left = 0
+        self.score_right = 0
+
+        # make paddles
+        x_buffer = 8
+        paddle_height = 70
+        paddle_width = 10
+        self.left = Paddle([x_buffer, height // 2], palette.GREEN, paddle_width, 
+                           paddle_height, height)
+        self.right = Paddle([width - x_buffer - paddle_width, height // 2], palette.GREEN, 
+                            paddle_width, paddle_height, height)
+
+        # make ball
+        # an rng of its own, as loading a snapshot sets its state
+        if rng is None:
+            rng = random.Random()
+        self.ball = Ball(palette.RED, (width, height), rng, ball_speed)
+
+        # make lines
+        text_buffer = 40
+        bottom_buffer = 10
+        self.top = Wall(bottom_buffer + text_buffer, palette.WHITE, width)
+        self.bottom = Wall(height - bottom_buffer, palette.WHITE, width)
+
+        # paddles, and anything else the ball can hit, for the broadphase;
+        # the walls span the arena and are checked as lines
+        self.colliders = spatial.SpatialHash()
+        self.colliders.insert(self.left, self.left.rect)
+        self.colliders.insert(self.right, self.right.rect)
+
+    def step(self, left_move, right_move):
+        ball = self.ball
+        left = self.left
+        right = self.right
+
+        ball.remember()
+        left.remember()
+        right.remember()
+
+        if left_move < 0:
+            left.up()
+        elif left_move > 0:
+            left.down()
+
+        if right_move < 0:
+            right.up()
+        elif right_move > 0:
+            right.down()
+
+        self.colliders.move(left, left.rect)
+        self.colliders.move(right, right.rect)
+
+        self.sweep_ball()
+        if ball.x < 0 or ball.x > self.width:
+            return self.point()
+
+        return None
+
+    def sweep_ball(self):
+        # move the ball one tick along its path, bouncing at the moment it meets
+        # a wall or paddle so that no speed lets it pass through one
+        ball = self.ball
+        remaining = 1.0
+        last = None
+        for i in range(MAX_BOUNCES):
+            hit, ticks = self.first_contact(remaining, last)
+            if hit is None:
+                break
+
+            ball.move(ticks)
+            remaining -= ticks
+            if hit is self.left:
+                ball.redirect(self.left.bounce(ball.y - ball.height // 2, "left"))
+            elif hit is self.right:
+                ball.redirect(self.right.bounce(ball.y - ball.height // 2, "right"))
+            else:
+                ball.direction[1] *= -1
+
+            # the ball is touching what it just hit, so skip it next time
+            last = hit
+            # draw from here: a line from where the tick started would cross it
+            ball.remember()
+
+        ball.move(remaining)
+
+    def first_contact(self, limit, skip):
+        # the wall or paddle the ball meets first within limit ticks, and when
+        ball = self.ball
+        contacts = [(self.top, ball.time_to_line(self.top.y, limit)),
+                    (self.bottom, ball.time_to_line(self.bottom.y, limit))]
+        # a pixel wider than the sweep: the hash leaves out rects that only touch
+        # it, which time_to_rect can still count as a contact
+        for obj in self.colliders.query(ball.sweep_rect(limit).inflate(2, 2)):
+            contacts.append((obj, ball.time_to_rect(obj.rect, limit)))
+
+        first = None
+        first_ticks = limit
+        for obj, ticks in contacts:
+            if obj is not skip and ticks is not None and ticks < first_ticks:
+                first = obj
+                first_ticks = ticks
+        return first, first_ticks
+
+    def point(self):
+        # the side the ball left through serves next; returns the scoring side
+        if self.ball.x < 0:
+            self.score_right += 1
+            self.ball.reset("left")
+            scorer = "right"
+        else:
+            self.score_left += 1
+            self.ball.reset("right")
+            scorer = "left"
+
+        self.left.reset()
+        self.right.reset()
+        self.colliders.move(self.left, self.left.rect)
+        self.colliders.move(self.right, self.right.rect)
+        return scorer
+
+    def finished(self):
+        return self.score_left >= self.win_score or self.score_right >= self.win_score
+
+    def new_snapshot(self):
+        return PongSnapshot()
+
+    def save(self, snapshot):
+        ball = self.ball
+        left = self.left
+        right = self.right
+        PONG_STATE.pack_into(snapshot.data, 0, ball.x, ball.y, ball.direction[0], ball.direction[1],
+                             ball.previous[0], ball.previous[1], left.pos[1], left.previous,
+                             right.pos[1], right.previous, self.score_left, self.score_right)
+        snapshot.rng_state = ball.rng.getstate()
+
+    def load(self, snapshot):
+        ball = self.ball
+        left = self.left
+        right = self.right
+        (ball.x, ball.y, x_vel, y_vel, x, y, left.pos[1], left.previous, right.pos[1],
+         right.previous, self.score_left, self.score_right) = PONG_STATE.unpack_from(snapshot.data)
+
+        ball.direction = [x_vel, y_vel]
+        ball.previous = (x, y)
+        ball.rect = pygame.rect.Rect(ball.x, ball.y, ball.width, ball.height)
+        for paddle in (left, right):
+            paddle.rect = pygame.rect.Rect(paddle.pos[0], paddle.pos[1], paddle.width, paddle.height)
+            self.colliders.move(paddle, paddle.rect)
+        ball.rng.setstate(snapshot.rng_state)
+
+
+class PongSnapshot:
+    # one tick of a PongGame, packed into a buffer that is reused for every save
+    def __init__(self):
+        self.data = bytearray(PONG_STATE.size)
+        self.rng_state = None
+
+    def digest(self):
+        # the rng is left out; it only changes when the game state does
+        return zlib.crc32(self.data)
+
+    def dump(self):
+        # the whole snapshot as bytes, for keeping on disk
+        return bytes(self.data) + rollback.pack_rng(self.rng_state)
+
+    def restore(self, data):
+        self.data[:] = data[:PONG_STATE.size]
+        self.rng_state = rollback.unpack_rng(data, PONG_STATE.size)
@@ -0,0 +1,180 @@
+import math
+import numpy as np
+
+# values returned by BatchPong.step for each game
+NO_POINT = 0
+LEFT_POINT = 1
+RIGHT_POINT = 2
+
+# same as pong.MAX_BOUNCES
+MAX_BOUNCES = 4
+
+# what the ball touched last; the order breaks ties like pong.PongGame.first_contact
+NOTHING = -1
+TOP = 0
+BOTTOM = 1
+LEFT = 2
+RIGHT = 3
+
+
+class BatchPong:
+    # count Pong games stepped together; follows pong.PongGame tick for tick
+    def __init__(self, count, width, height, win_score=10, seed=None, ball_speed=15):
+        self.count = count
+        self.width = width
+        self.height = height
+        self.win_score = win_score
+        self.rng = np.random.default_rng(seed)
+
+        # same layout as pong.PongGame
+        self.ball_speed = ball_speed
+        self.ball_size = 10
+        self.paddle_speed = 10
+        self.paddle_width = 10
+        self.paddle_height = 70
+        x_buffer = 8
+        self.left_x = x_buffer
+        self.right_x = width - x_buffer - self.paddle_width
+        self.top_y = 10 + 40
+        self.bottom_y = height - 10
+
+        self.ball_x = np.zeros(count)
+        self.ball_y = np.zeros(count)
+        self.ball_dx = np.zeros(count)
+        self.ball_dy = np.zeros(count)
+        self.left_y = np.zeros(count, dtype=np.int64)
+        self.right_y = np.zeros(count, dtype=np.int64)
+        self.score_left = np.zeros(count, dtype=np.int64)
+        self.score_right = np.zeros(count, dtype=np.int64)
+
+        self.reset()
+
+    def reset(self, mask=None, serve=None):
+        # serve is -1 (towards the left) or 1 per game; random when not given
+        if mask is None:
+            mask = np.ones(self.count, dtype=bool)
+        if serve is None:
+            serve = self.rng.choice([-1, 1], self.count)
+
+        self.score_left[mask] = 0
+        self.score_right[mask] = 0
+        self.serve(mask, np.asarray(serve))
+
+    def serve(self, mask, direction):
+        self.ball_x[mask] = self.width // 2 - self.ball_size // 2
+        self.ball_y[mask] = self.height // 2 - self.ball_size // 2
+        self.ball_dx[mask] = np.where(direction < 0, -self.ball_speed, self.ball_speed)[mask]
+        self.ball_dy[mask] = 0
+
+        self.left_y[mask] = self.height // 2 - self.paddle_height // 2
+        self.right_y[mask] = self.height // 2 - self.paddle_height // 2
+
+    def step(self, left_moves, right_moves):
+        left_moves = np.asarray(left_moves)
+        right_moves = np.asarray(right_moves)
+        self.left_y += np.where(left_moves < 0, -self.paddle_speed,
+                                np.where(left_moves > 0, self.paddle_speed, 0))
+        self.right_y += np.where(right_moves < 0, -self.paddle_speed,
+                                 np.where(right_moves > 0, self.paddle_speed, 0))
+
+        self.sweep()
+        right_point = self.ball_x < 0
+        left_point = ~right_point & (self.ball_x > self.width)
+
+        self.score_right += right_point
+        self.score_left += left_point
+        scored = right_point | left_point
+        if scored.any():
+            # the side the ball left through serves next
+            self.serve(scored, np.where(right_point, -1, 1))
+
+        return np.where(left_point, LEFT_POINT, np.where(right_point, RIGHT_POINT, NO_POINT))
+
+    def sweep(self):
+        # pong.PongGame.sweep_ball for every game at once
+        games = np.arange(self.count)
+        remaining = np.ones(self.count)
+        last = np.full(self.count, NOTHING)
+        # games stop looking once their ball has a clear path
+        active = np.ones(self.count, dtype=bool)
+
+        for i in range(MAX_BOUNCES):
+            times = np.stack([
+                self.time_to_line(self.top_y, remaining),
+                self.time_to_line(self.bottom_y, remaining),
+                self.time_to_rect(self.left_x, self.left_y, remaining),
+                self.time_to_rect(self.right_x, self.right_y, remaining),
+            ])
+            skipped = last != NOTHING
+            times[last[skipped], games[skipped]] = np.inf
+
+            # argmin picks the first of equal times, as first_contact does
+            hit = times.argmin(axis=0)
+            ticks = times[hit, games]
+            touching = active & (ticks < np.inf)
+            if not touching.any():
+                break
+            active = touching
+
+            ticks = np.where(touching, ticks, 0.0)
+            self.ball_x += self.ball_dx * ticks
+            self.ball_y += self.ball_dy * ticks
+            remaining -= ticks
+
+            wall = touching & ((hit == TOP) | (hit == BOTTOM))
+            self.ball_dy = np.where(wall, -self.ball_dy, self.ball_dy)
+            self.bounce(touching & (hit == LEFT), self.left_y, False)
+            self.bounce(touching & (hit == RIGHT), self.right_y, True)
+            last = np.where(touching, hit, NOTHING)
+
+        self.ball_x += self.ball_dx * remaining
+        self.ball_y += self.ball_dy * remaining
+
+    def time_to_line(self, y, limit):
+        # as pong.Ball.time_to_line, with inf for no contact
+        dy = self.ball_dy
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ticks = (y - self.ball_y) / dy
+        valid = (dy != 0) & (ticks >= 0) & (ticks < limit)
+        return np.where(valid, ticks, np.inf)
+
+    def time_to_rect(self, paddle_x, paddle_y, limit):
+        # as pong.Ball.time_to_rect, with inf for no contact
+        entry = np.zeros(self.count)
+        leave = limit.copy()
+        valid = np.ones(self.count, dtype=bool)
+        axes = ((self.ball_x, self.ball_dx, paddle_x - self.ball_size,
+                 paddle_x + self.paddle_width),
+                (self.ball_y, self.ball_dy, paddle_y - self.ball_size,
+                 paddle_y + self.paddle_height))
+
+        for pos, vel, low, high in axes:
+            still = vel == 0
+            valid &= ~(still & ((pos <= low) | (pos >= high)))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                near = (low - pos) / vel
+                far = (high - pos) / vel
+            near, far = np.minimum(near, far), np.maximum(near, far)
+            entry = np.where(still, entry, np.maximum(entry, near))
+            leave = np.where(still, leave, np.minimum(leave, far))
+
+        valid &= entry < leave
+        return np.where(valid, entry, np.inf)
+
+    def bounce(self, hit, paddle_y, right):
+        if not hit.any():
+            return
+
+        max_angle = 1.2
+        center = self.paddle_height // 2
+        dist = self.ball_y[hit] - self.ball_size // 2 - paddle_y[hit]
+        angle = np.clip(max_angle * ((dist - center) / center), -max_angle, max_angle)
+        if right:
+            angle = math.pi - angle
+
+        # math.cos/sin rather than numpy's, whose last bit can differ from the scalar game
+        self.ball_dx[hit] = [self.ball_speed * math.cos(a) for a in angle]
+        self.ball_dy[hit] = [self.ball_speed * math.sin(a) for a in angle]
+
+    def finished(self):
+        return (self.score_left >= self.win_score) | (self.score_right >= self.win_score)
@@ -0,0 +1,154 @@
+import pygame
+import random
+import UI
+import palette
+import pong
+import scenes
+
+
+class PongMain(scenes.Menu):
+    def __init__(self, data):
+        super().__init__(data)
+        self.text = ["PyPong"]
+        self.text_color = palette.GREEN
+        
+        self.setup_ui()
+    
+    def setup_ui(self):
+        self.add_text()
+
+        self.add_button("play", lambda: ["pong_double", PongDouble, None], (2, 0, 6, 5))
+        self.add_button("back", self.back_signal, (2, 1, 6, 5))
+
+
+class PongDouble(scenes.GameScene):
+    def __init__(self, data):
+        super().__init__(data)
+
+        self.win_score = 10
+        self.countdown = True
+        self.dirty_rendering = True
+        self.input_width = 2
+
+        self.setup_game()
+
+    def setup_game(self):
+        # get display dimensions
+        window = pygame.display.get_surface()
+        width = window.get_width()
+        height = window.get_height()
+
+        self.game = self.make_game(width, height)
+        
+        # set controls
+        self.l_up = pygame.K_w
+        self.l_down = pygame.K_a
+        self.r_up = pygame.K_RIGHTBRACKET
+        self.r_down = pygame.K_QUOTE
+
+        self.objects["left"] = self.game.left
+        self.objects["right"] = self.game.right
+        self.objects["ball"] = self.game.ball
+
+        # score text
+        x_buffer = 8
+        font_size = 40
+        y_buffer = 5
+        score_left_pos = (x_buffer, y_buffer)
+        score_right_pos = (width - font_size * 2, y_buffer)
+        self.objects["left_score"] = UI.GameText(str(self.game.score_left), score_left_pos, 
+                                                 palette.GREEN, font_size)
+        self.objects["right_score"] = UI.GameText(str(self.game.score_right), score_right_pos, 
+                                                  palette.GREEN, font_size)
+
+        self.objects["top"] = self.game.top
+        self.objects["bottom"] = self.game.bottom
+
+    def make_game(self, width, height):
+        return pong.PongGame(width, height, self.win_score, random.Random(self.seed()))
+
+    def process_frame(self):
+        if self.countdown:
+            self.countdown = False
+            self.game.point()
+            return self.end_round()
+
+        for event in pygame.event.get():
+            self.check_quit(event)
+
+        # None when there is nothing to play this tick
+        moves = self.read_moves()
+        if moves is None:
+            return None
+
+        if self.play(moves):
+            return self.end_round()
+
+    def simulate(self, moves):
+        return self.game.step(*moves) is not None
+
+    def encode_inputs(self, moves):
+        return moves
+
+    def decode_inputs(self, codes):
+        return codes
+
+    def load_state(self, snapshot):
+        super().load_state(snapshot)
+        self.objects["left_score"].text = str(self.game.score_left)
+        self.objects["right_score"].text = str(self.game.score_right)
+
+    def read_moves(self):
+        key_list = pygame.key.get_pressed()
+        left_move = self.paddle_move(key_list, self.l_up, self.l_down)
+        right_move = self.paddle_move(key_list, self.r_up, self.r_down)
+        return left_move, right_move
+
+    def paddle_move(self, key_list, up, down):
+        if key_list[up]:
+            return -1
+        elif key_list[down]:
+            return 1
+        return 0
+    
+    def end_round(self):
+        self.objects["left_score"].text = str(self.game.score_left)
+        self.objects["right_score"].text = str(self.game.score_right)
+        
+        if self.game.finished():
+            return ("pong_end", PongEnd, (self.game.score_left, self.game.score_right), True)
+
+        back = ("pong_double", PongDouble, self.data, True)
+        countdown = ("countdown", scenes.Countdown, 
+                     (self.surface_snapshot(), [["Ready..."], ["Go!"]], 30, back))
+                     
+        return countdown
+
+
+class PongEnd(scenes.Menu):
+    def __init__(self, data):
+        super().__init__(data)
+        self.score_left, self.score_right = self.data
+
+        if self.score_left > self.score_right:
+            winner = "left"
+        else:
+            winner = "right"
+
+        self.text = [f"{winner} side sucked less than the other side", 
+                     f"Final score: {self.score_left} - {self.score_right}",
+                     "press enter to continue"]
+        self.text_color = palette.WHITE
+
+        self.setup_ui()
+
+    def setup_ui(self):
+        self.add_text()
+    
+    def process_frame(self):
+        for event in pygame.event.get():
+            self.check_quit(event)
+            
+            if event.type == pygame.KEYUP:
+                if event.key == pygame.K_RETURN:
+                    return ("pong_main", PongMain, None, True)
@@ -0,0 +1,143 @@
+import array
+import time
+import pygame
+import palette
+import UI
+
+# phases of a frame, in the order they happen
+PHASES = ("sleep", "events", "update", "draw", "flip", "overlay")
+
+PROFILE_SIZE = 600
+OVERLAY_KEY = pygame.K_F3
+OVERLAY_SIZE = (360, 130)
+OVERLAY_TEXT_SIZE = 20
+# frames between refreshes of the overlay's numbers
+OVERLAY_REFRESH = 15
+
+
+class FrameProfiler:
+    # the last size frames, as seconds spent in each phase
+    def __init__(self, size=PROFILE_SIZE):
+        self.size = size
+        self.samples = {phase: array.array("d", bytes(8 * size)) for phase in PHASES}
+        self.totals = array.array("d", bytes(8 * size))
+        self.index = 0
+        self.count = 0
+
+        # time spent in each phase of the frame in progress
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.last = time.perf_counter()
+
+    def lap(self, phase):
+        # charge the time since the last lap to phase
+        now = time.perf_counter()
+        self.current[phase] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        total = 0.0
+        for phase, spent in self.current.items():
+            self.samples[phase][self.index] = spent
+            self.current[phase] = 0.0
+            total += spent
+        self.totals[self.index] = total
+
+        self.index = (self.index + 1) % self.size
+        self.count += 1
+
+    def recent(self, frames):
+        # indices of the last frames frames, oldest first
+        frames = min(frames, self.count, self.size)
+        return [(self.index - frames + i) % self.size for i in range(frames)]
+
+    def fps(self, frames=60):
+        indices = self.recent(frames)
+        spent = sum(self.totals[i] for i in indices)
+        return len(indices) / spent if spent else 0.0
+
+    def breakdown(self, frames=60):
+        # mean milliseconds per frame in each phase
+        indices = self.recent(frames)
+        if not indices:
+            return dict.fromkeys(PHASES, 0.0)
+        return {phase: sum(self.samples[phase][i] for i in indices) * 1000 / len(indices)
+                for phase in PHASES}
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            f.write(",".join(PHASES + ("total",)) + "\n")
+            for i in self.recent(self.size):
+                row = [self.samples[phase][i] * 1000 for phase in PHASES] + [self.totals[i] * 1000]
+                f.write(",".join(f"{ms:.4f}" for ms in row) + "\n")
+
+
+def startup_report(marks):
+    # marks are (label, perf_counter time) in order, the first being the start
+    start = marks[0][1]
+    lines = []
+    previous = start
+    for label, when in marks[1:]:
+        lines.append(f"{label:<16}{(when - previous) * 1000:8.1f} ms{(when - start) * 1000:8.1f} ms")
+        previous = when
+    return lines
+
+
+class PerfOverlay:
+    def __init__(self, profiler, budget_ms=1000 / 60, pos=(10, 60)):
+        self.profiler = profiler
+        self.budget_ms = budget_ms
+        self.rect = pygame.rect.Rect(pos, OVERLAY_SIZE)
+        self.visible = False
+
+        self.font_size = OVERLAY_TEXT_SIZE
+        self.lines = []
+        self.frames = 0
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.frames = 0
+
+    def refresh(self):
+        profiler = self.profiler
+        breakdown = profiler.breakdown()
+        font = UI.get_font(self.font_size)
+
+        # rendered directly; numbers change too often for the shared text cache
+        texts = [f"{profiler.fps():5.1f} fps"]
+        texts += [f"{phase:<8}{ms:6.2f} ms" for phase, ms in breakdown.items()]
+        self.lines = [font.render(text, True, palette.GREEN) for text in texts]
+
+    def draw(self, surface=None):
+        if surface is None:
+            window = pygame.display.get_surface()
+        else:
+            window = surface
+
+        if self.frames % OVERLAY_REFRESH == 0:
+            self.refresh()
+        self.frames += 1
+
+        window.fill(palette.BLACK, self.rect)
+        pygame.draw.rect(window, palette.WHITE, self.rect, 1)
+
+        x, y = self.rect.x + 5, self.rect.y + 5
+        for line in self.lines:
+            window.blit(line, (x, y))
+            y += line.get_height()
+
+        # frame times, newest on the right; the red line is the frame budget
+        graph = pygame.rect.Rect(self.rect.x + 170, self.rect.y + 5,
+                                 self.rect.width - 175, self.rect.height - 10)
+        scale = graph.height / (self.budget_ms * 2)
+        budget_y = graph.bottom - round(self.budget_ms * scale)
+        pygame.draw.line(window, palette.RED, (graph.left, budget_y), (graph.right, budget_y))
+
+        totals = self.profiler.totals
+        points = []
+        for x, i in enumerate(self.profiler.recent(graph.width)):
+            height = min(totals[i] * 1000 * scale, graph.height)
+            points.append((graph.left + x, graph.bottom - round(height)))
+        if len(points) > 1:
+            pygame.draw.lines(window, palette.WHITE, False, points)
+
+        return self.rect
@@ -0,0 +1,309 @@
+import copy
+import mmap
+import pygame
+import struct
+import surfaces
+import zlib
+
+
+class StateReplay:
+    # ring of per-tick object states; frames are redrawn from state on demand
+    def __init__(self, size):
+        self.frames = [None] * size
+        self.sources = {}
+        self.actors = {}
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, index):
+        return self.frames[index]
+
+    def has_frame(self, index):
+        return self.frames[index] is not None
+
+    def record(self, pointer, scene):
+        frame = []
+        for name, obj in scene.objects.items():
+            # replays draw from private copies so later resets can't touch them
+            if self.sources.get(name) is not obj:
+                self.sources[name] = obj
+                self.actors[name] = copy.copy(obj)
+            frame.append((self.actors[name], obj.get_state()))
+
+        self.frames[pointer] = tuple(frame)
+
+    def draw(self, frame, surface):
+        for actor, state in frame:
+            actor.set_state(state)
+            actor.draw(surface)
+
+
+
+class PixelReplay:
+    # ring of rendered frames; a keyframe every keyframe_interval slots and
+    # only the bands of changed rows against the previous frame in between
+    def __init__(self, size, keyframe_interval=30, compress=True):
+        self.frames = [None] * size
+        self.keyframe_interval = keyframe_interval
+        self.compress = compress
+
+        self.previous = None
+        self.previous_pointer = None
+
+        self.decoded = None
+        self.decoded_index = None
+        self.surface = None
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, index):
+        if self.frames[index] is None:
+            return None
+
+        if index != self.decoded_index:
+            self.decode(index)
+        return self.surface
+
+    def has_frame(self, index):
+        # without decoding it, unlike indexing
+        return self.frames[index] is not None
+
+    def record(self, pointer, scene):
+        capture = surfaces.borrow_window_sized()
+        capture.fill((0, 0, 0))
+        scene.draw(capture)
+        raw = pygame.image.tobytes(capture, "RGB")
+        size = capture.get_size()
+        surfaces.pool.give_back(capture)
+
+        if self.previous is not None and len(self.previous) != len(raw):
+            self.previous = None
+
+        follows = self.previous_pointer == (pointer - 1) % len(self.frames)
+        if pointer % self.keyframe_interval == 0 or self.previous is None or not follows:
+            frame = (size, True, [(0, self.pack(raw))])
+        else:
+            frame = (size, False, self.changed_bands(raw, self.previous, size[0] * 3))
+
+        self.frames[pointer] = frame
+        self.previous = raw
+        self.previous_pointer = pointer
+        if self.decoded_index == pointer:
+            self.decoded_index = None
+
+        # diffs that chained back through the overwritten slot can't be decoded anymore
+        index = (pointer + 1) % len(self.frames)
+        while self.frames[index] is not None and not self.frames[index][1]:
+            self.frames[index] = None
+            if self.decoded_index == index:
+                self.decoded_index = None
+            index = (index + 1) % len(self.frames)
+
+    def changed_bands(self, raw, previous, pitch):
+        # rows are compared and packed through views, so nothing is copied
+        # but the bands kept; startswith at an offset compares in place
+        bands = []
+        band_start = None
+        view = memoryview(raw)
+        before = memoryview(previous)
+        for offset in range(0, len(raw) + pitch, pitch):
+            changed = (offset < len(raw) and
+                       not raw.startswith(before[offset:offset + pitch], offset))
+            if changed and band_start is None:
+                band_start = offset
+            elif not changed and band_start is not None:
+                bands.append((band_start, self.pack(view[band_start:offset])))
+                band_start = None
+        return bands
+
+    def decode(self, index):
+        # patch forward from whichever is nearer behind index, the frame
+        # already decoded or the keyframe, so any frame costs at most
+        # keyframe_interval patches wherever it sits and whichever way it's reached
+        chain = [index]
+        while not self.frames[chain[-1]][1] and chain[-1] != self.decoded_index:
+            chain.append((chain[-1] - 1) % len(self.frames))
+        if chain[-1] == self.decoded_index:
+            chain.pop()
+
+        for position in reversed(chain):
+            size, key, bands = self.frames[position]
+            if key and (self.decoded is None or len(self.decoded) != size[0] * size[1] * 3):
+                self.decoded = bytearray(size[0] * size[1] * 3)
+                self.surface = pygame.image.frombuffer(self.decoded, size, "RGB")
+
+            # the surface shares self.decoded, so patching the bytes updates it in place
+            for offset, payload in bands:
+                data = self.unpack(payload)
+                self.decoded[offset:offset + len(data)] = data
+        self.decoded_index = index
+
+    def pack(self, data):
+        if self.compress:
+            return zlib.compress(data, 1)
+        return bytes(data)
+
+    def unpack(self, data):
+        if self.compress:
+            return zlib.decompress(data)
+        return data
+
+    def memory(self):
+        total = 0
+        for frame in self.frames:
+            if frame is not None:
+                total += sum(len(payload) for offset, payload in frame[2])
+        return total
+
+    def draw(self, frame, surface):
+        surface.blit(frame, (0, 0))
+
+
+# replay files: a header, one fixed-width record per tick, the keyframes,
+# then an index of them. A record holds the number of the keyframe its tick
+# plays on from and the tick's inputs, so any tick is found without a search
+FILE_MAGIC = b"DKRP"
+FILE_VERSION = 1
+# magic, version, scene name, seed, window width and height, fps, input width,
+# ticks, keyframes, snapshot size, index offset
+FILE_HEADER = struct.Struct("<4sH16sIHHHHIIIQ")
+# tick, offset and compressed length of each keyframe
+INDEX_ENTRY = struct.Struct("<IQI")
+# most ticks between keyframes; a keyframe is also taken after each round
+KEYFRAME_INTERVAL = 300
+
+
+class ReplayRecorder:
+    # collects a scene's ticks as it plays them and writes the file on close
+    def __init__(self, path, name, scene):
+        self.path = path
+        self.name = name
+        self.seed = scene.seed()
+        self.size = pygame.display.get_surface().get_size()
+        self.fps = round(scene.fps)
+        self.input_width = scene.input_width
+        self.layout = struct.Struct(f"<I{self.input_width}b")
+
+        self.snapshot = scene.new_snapshot()
+        self.snapshot_size = 0
+        self.records = bytearray()
+        # (tick, compressed snapshot)
+        self.keyframes = []
+        self.tick = 0
+        self.round_ended = True
+        self.closed = False
+
+    def record_keyframe(self, scene):
+        scene.save_state(self.snapshot)
+        data = self.snapshot.dump()
+        self.snapshot_size = len(data)
+        self.keyframes.append((self.tick, zlib.compress(data)))
+        self.round_ended = False
+
+    def record(self, scene, inputs):
+        # call before the scene simulates inputs
+        if self.round_ended or self.tick - self.keyframes[-1][0] >= KEYFRAME_INTERVAL:
+            self.record_keyframe(scene)
+        self.records += self.layout.pack(len(self.keyframes) - 1, *scene.encode_inputs(inputs))
+        self.tick += 1
+
+    def round_over(self):
+        # whatever sets up the next round happens between ticks, so start from a keyframe
+        self.round_ended = True
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.tick == 0:
+            return
+
+        # keyframes follow the records, and the index follows them
+        index = bytearray()
+        offset = FILE_HEADER.size + len(self.records)
+        for tick, data in self.keyframes:
+            index += INDEX_ENTRY.pack(tick, offset, len(data))
+            offset += len(data)
+
+        header = FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, self.name.encode(), self.seed,
+                                  self.size[0], self.size[1], self.fps, self.input_width,
+                                  self.tick, len(self.keyframes), self.snapshot_size, offset)
+        with open(self.path, "wb") as f:
+            f.write(header)
+            f.write(self.records)
+            for tick, data in self.keyframes:
+                f.write(data)
+            f.write(index)
+
+
+class FileReplay:
+    # a replay file, memory-mapped so only the parts looked at are read. Frame
+    # i is the game before tick i, rebuilt in a scene of the recorded kind from
+    # the keyframe before it; frames after the last one drawn play on from it
+    def __init__(self, path):
+        import scenes
+
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, name, self.seed, width, height, self.fps, input_width, self.ticks,
+         keyframes, snapshot_size, self.index_offset) = FILE_HEADER.unpack_from(self.map)
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            raise ValueError(f"{path} is not a replay file")
+        self.name = name.rstrip(b"\0").decode()
+
+        if pygame.display.get_surface().get_size() != (width, height):
+            raise ValueError(f"{path} was recorded in a {width}x{height} window")
+        self.scene = scenes.template_scene(self.name)
+        self.snapshot = self.scene.new_snapshot()
+        self.scene.save_state(self.snapshot)
+        if len(self.snapshot.dump()) != snapshot_size:
+            raise ValueError(f"{path} was recorded with different game settings")
+
+        self.layout = struct.Struct(f"<I{input_width}b")
+        # the tick the scene is at, and the keyframe it came from
+        self.position = None
+        self.keyframe = None
+
+    def __len__(self):
+        return self.ticks + 1
+
+    def __getitem__(self, index):
+        if self.has_frame(index):
+            return (index,)
+        return None
+
+    def has_frame(self, index):
+        return 0 <= index <= self.ticks
+
+    def read(self, tick):
+        # the keyframe number and inputs recorded for tick
+        values = self.layout.unpack_from(self.map, FILE_HEADER.size + tick * self.layout.size)
+        return values[0], values[1:]
+
+    def seek(self, tick):
+        # the state after the last tick is played on from the last tick's keyframe
+        keyframe = self.read(min(tick, self.ticks - 1))[0]
+        if keyframe != self.keyframe or self.position is None or self.position > tick:
+            self.load(keyframe)
+
+        inputs = [self.scene.decode_inputs(self.read(t)[1]) for t in range(self.position, tick)]
+        self.scene.resimulate(inputs)
+        self.position = tick
+
+    def load(self, keyframe):
+        tick, offset, length = INDEX_ENTRY.unpack_from(self.map,
+                                                       self.index_offset + keyframe * INDEX_ENTRY.size)
+        self.snapshot.restore(zlib.decompress(self.map[offset:offset + length]))
+        self.scene.load_state(self.snapshot)
+        self.position = tick
+        self.keyframe = keyframe
+
+    def draw(self, frame, surface):
+        self.seek(frame[0])
+        self.scene.draw(surface)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
@@ -0,0 +1,84 @@
+import array
+import struct
+
+ROLLBACK_TICKS = 16
+
+# a Mersenne Twister's state as random.getstate() gives it: version, 625 words,
+# and the spare gauss value with a flag for whether there is one
+RNG_STATE = struct.Struct("<i625Id?")
+
+
+def pack_rng(state):
+    version, words, gauss = state
+    return RNG_STATE.pack(version, *words, gauss or 0.0, gauss is not None)
+
+
+def unpack_rng(data, offset=0):
+    values = RNG_STATE.unpack_from(data, offset)
+    gauss = values[-2] if values[-1] else None
+    return (values[0], values[1:626], gauss)
+
+
+class SnapshotRing:
+    # snapshots of the last size ticks, made once up front by make and then
+    # overwritten in turn, so saving a tick never allocates
+    def __init__(self, make, size=ROLLBACK_TICKS):
+        self.snapshots = [make() for i in range(size)]
+        self.ticks = array.array("q", [-1] * size)
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def slot(self, tick):
+        # the snapshot to save tick into, taking over the oldest one
+        index = tick % len(self.snapshots)
+        self.ticks[index] = tick
+        return self.snapshots[index]
+
+    def get(self, tick):
+        # the snapshot saved for tick, or None once it has been overwritten
+        index = tick % len(self.snapshots)
+        if self.ticks[index] != tick:
+            return None
+        return self.snapshots[index]
+
+    def oldest(self):
+        saved = [tick for tick in self.ticks if tick >= 0]
+        return min(saved) if saved else None
+
+
+class History:
+    # the inputs and the state before each of a scene's last ticks, so a tick
+    # played on predicted inputs can be played again once the real ones
+    # arrive; it covers one round, so make a new one when a round ends
+    def __init__(self, scene, size=ROLLBACK_TICKS):
+        # going back means playing ticks again, which only gameplay scenes can
+        if not callable(getattr(scene, "simulate", None)):
+            raise TypeError(f"{type(scene).__name__} can't simulate ticks to roll back")
+        self.scene = scene
+        self.ring = SnapshotRing(scene.new_snapshot, size)
+        self.inputs = [None] * size
+        self.tick = 0
+
+    def record(self, inputs):
+        # call with a tick's inputs before the scene simulates it
+        self.scene.save_state(self.ring.slot(self.tick))
+        self.inputs[self.tick % len(self.ring)] = inputs
+        self.tick += 1
+
+    def rewind(self, tick, inputs=None):
+        # go back to before tick, swap in inputs for it if given, and play on to
+        # the present; returns False when tick is too old to go back to
+        snapshot = self.ring.get(tick)
+        if snapshot is None:
+            return False
+
+        size = len(self.ring)
+        if inputs is not None:
+            self.inputs[tick % size] = inputs
+        ticks = [self.inputs[t % size] for t in range(tick, self.tick)]
+        snapshots = [None] + [self.ring.slot(t) for t in range(tick + 1, self.tick)]
+
+        self.scene.load_state(snapshot)
+        self.scene.resimulate(ticks, snapshots)
+        return True
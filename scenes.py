@@ -1,50 +1,261 @@
 import pygame
 import UI
 import palette
-import sys
-import snake
-import pong
+import os
 import random
+import sys
+import time
+import importlib
+import replays
+import surfaces
+import profiler
 
 NORMAL_FPS = 60
+RENDER_FPS = 60
+IDLE_TIMEOUT = 500
+MAX_TICKS_PER_FRAME = 5
+# dirty rects, and the share of the window they span, past which a frame is drawn in full
+DIRTY_RECT_LIMIT = 64
+DIRTY_AREA_LIMIT = 0.5
+
+# keys that save the replay on screen, and the format each saves as
+EXPORT_KEYS = {pygame.K_g: "gif", pygame.K_p: "png"}
+# replay playback speeds, stepped through with the up and down arrows
+REPLAY_SPEEDS = (0.25, 0.5, 1, 2, 4, 8)
+
+# main menu entries as (title, scene name, module, class name); the module
+# is only imported once its entry is chosen
+games = []
+
+
+def register_game(title, name, module, scene):
+    games.append((title, name, module, scene))
+
+
+def load_scene(module, scene):
+    return getattr(importlib.import_module(module), scene)
+
+
+register_game("PyPong", "pong", "pong_scenes", "PongMain")
+register_game("Snake", "snake", "snake_scenes", "SnakeMain")
+
+# gameplay scenes that can be saved to disk and rebuilt from their name, as
+# (module, class name, data); data only needs to give the same objects
+recordable = {
+    "pong_double": ("pong_scenes", "PongDouble", None),
+    "snake_single": ("snake_scenes", "SnakeSingle", NORMAL_FPS),
+    "snake_double": ("snake_scenes", "SnakeDouble", NORMAL_FPS),
+}
+
+
+def template_scene(name):
+    module, scene, data = recordable[name]
+    return load_scene(module, scene)(data)
+
 
 class SceneManager:
     def __init__(self, scene, name):
         self.scenes = {name:scene}
         self.currently_running = name
         self.fps = self.scenes[self.currently_running].fps
+        self.render_fps = RENDER_FPS
+        self.last_drawn = None
+        self.redraw = True
+
+        # milliseconds of simulation owed, and how far the last frame got into the next tick
+        self.accumulator = 0
+        self.alpha = 1.0
+
+        self.profiler = None
+        self.overlay = None
+        # directory gameplay is saved to as replay files, when set
+        self.record_dir = None
+        self.recordings = 0
+        # streams gameplay ticks to spectators when set
+        self.broadcaster = None
+
+    def enable_profiler(self, size=profiler.PROFILE_SIZE):
+        self.profiler = profiler.FrameProfiler(size)
+        self.overlay = profiler.PerfOverlay(self.profiler, 1000 / self.render_fps)
+
+    def lap(self, phase):
+        if self.profiler is not None:
+            self.profiler.lap(phase)
 
     def add_scene(self, scene, name):
         self.scenes[name] = scene
     
     def del_scene(self, name):
-        self.scenes.pop(name)
+        self.stop_recording(self.scenes.pop(name))
     
     def clear_scenes(self):
+        for scene in self.scenes.values():
+            self.stop_recording(scene)
         self.scenes.clear()
 
     def change_scene(self, name, obj, data, delete = False, clear = False):
         if clear:
             self.clear_scenes()
         elif delete:
-            self.scenes.pop(self.currently_running)
+            self.del_scene(self.currently_running)
 
         if name not in self.scenes:
             new = obj(data)
             self.add_scene(new, name)
+            self.start_recording(new, name)
             self.currently_running = name
         else:
             self.currently_running = name
 
+        self.redraw = True
+        self.accumulator = 0
+        self.alpha = 1.0
+
+    def start_recording(self, scene, name):
+        if self.record_dir is None or name not in recordable:
+            return
+        self.recordings += 1
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.record_dir, f"{name}-{stamp}-{self.recordings}.dkr")
+        scene.recorder = replays.ReplayRecorder(path, name, scene)
+
+    def stop_recording(self, scene):
+        if getattr(scene, "recorder", None) is not None:
+            scene.recorder.close()
+            scene.recorder = None
+
+    def close(self):
+        # saves anything still being recorded
+        for scene in self.scenes.values():
+            self.stop_recording(scene)
+
     def draw(self):
         window = pygame.display.get_surface()
-        window.fill(palette.BLACK)
-        self.scenes[self.currently_running].draw()
-        pygame.display.flip()
+        scene = self.scenes[self.currently_running]
+
+        # idle scenes only change in response to input
+        if scene.idle and not self.redraw:
+            return
+        self.redraw = False
+
+        scene.interpolate(self.alpha)
+
+        overlay = self.overlay is not None and self.overlay.visible
+        # taken every frame, so tracking follows on from full frames too
+        rects = scene.dirty_rects() if scene.dirty_rendering else []
+        if (scene.dirty_rendering and scene is self.last_drawn and not scene.full_redraw and
+                self.worth_clipping(rects, window)):
+            # one pass clipped to everything that changed, so every pixel in it is
+            # cleared and drawn exactly once; antialiased text would brighten if
+            # blended twice, and a pass per rect costs rects times objects
+            if rects:
+                window.set_clip(rects[0].unionall(rects[1:]))
+                window.fill(palette.BLACK)
+                scene.draw()
+                window.set_clip(None)
+            self.lap("draw")
+            if overlay:
+                rects.append(self.overlay.draw(window))
+                self.lap("overlay")
+            pygame.display.update(rects)
+        else:
+            window.fill(palette.BLACK)
+            scene.draw()
+            scene.full_redraw = False
+            self.lap("draw")
+            if overlay:
+                self.overlay.draw(window)
+                self.lap("overlay")
+            pygame.display.flip()
+        self.lap("flip")
+
+        self.last_drawn = scene
+
+    def worth_clipping(self, rects, window):
+        # past a handful of rects or a large share of the window, one full
+        # redraw and flip costs less than filling and updating the pieces
+        if len(rects) > DIRTY_RECT_LIMIT:
+            return False
+        if not rects:
+            return True
+        clip = rects[0].unionall(rects[1:])
+        return clip.width * clip.height <= DIRTY_AREA_LIMIT * window.get_width() * window.get_height()
 
     def process_frame(self):
-        self.fps = self.scenes[self.currently_running].fps
-        return self.scenes[self.currently_running].process_frame()
+        scene = self.scenes[self.currently_running]
+        self.fps = scene.fps
+
+        if scene.idle:
+            self.wait_for_input()
+            self.lap("sleep")
+
+        if self.profiler is not None:
+            self.pump_events()
+            self.lap("events")
+
+        result = scene.process_frame()
+        self.lap("update")
+        return result
+
+    def run_frame(self, clock):
+        # one pass of the main loop
+        elapsed = clock.tick(self.render_fps)
+        self.lap("sleep")
+        self.advance(elapsed)
+        self.draw()
+        if self.profiler is not None:
+            self.profiler.end_frame()
+
+    def pump_events(self):
+        # fetch events before the scene sees them, taking the overlay key out
+        pygame.event.pump()
+        for event in pygame.event.get(pygame.KEYDOWN):
+            if event.key == profiler.OVERLAY_KEY:
+                self.overlay.toggle()
+                # the scene has to be drawn in full again where the overlay was
+                self.last_drawn = None
+                self.redraw = True
+            else:
+                pygame.event.post(event)
+
+    def advance(self, elapsed):
+        # run the scene at its own tick rate, however fast frames are drawn
+        scene = self.scenes[self.currently_running]
+        if scene.idle:
+            result = self.process_frame()
+            if result:
+                self.change_scene(*result)
+            return
+
+        tick = 1000 / scene.fps
+        self.accumulator += elapsed
+        ticks = 0
+        while self.accumulator >= tick:
+            self.accumulator -= tick
+            result = self.process_frame()
+            if result:
+                self.change_scene(*result)
+                return
+            if self.broadcaster is not None:
+                self.broadcaster.publish(self.currently_running, scene)
+
+            # under load, drop the backlog rather than fall further behind
+            ticks += 1
+            if ticks >= MAX_TICKS_PER_FRAME:
+                self.accumulator = 0
+                break
+
+        self.alpha = self.accumulator / tick
+
+    def wait_for_input(self):
+        # block instead of polling; events go back on the queue for the scene
+        event = pygame.event.wait(IDLE_TIMEOUT)
+        if event.type == pygame.NOEVENT:
+            return
+
+        for event in [event] + pygame.event.get():
+            pygame.event.post(event)
+        self.redraw = True
 
 
 class Scene:
@@ -54,33 +265,40 @@ class Scene:
         self.replay_size = 150
         self.fps = NORMAL_FPS
         self.objects = {}
-        self.replay = [None] * self.replay_size
+        # "state" or "pixels"; the replay is only made on the first frame
+        # saved, so subclasses can choose after calling this
+        self.replay_mode = "state"
+        self.replay = None
         self.replay_pointer = 0
+        self.dirty_rendering = False
+        # set when the screen no longer follows from the last frame drawn
+        self.full_redraw = False
+        self.idle = False
 
-    def replay_snapshot(self):
-        window = pygame.display.get_surface()
-        width = window.get_width()
-        height = window.get_height()
+    def make_replay(self):
+        if self.replay_mode == "pixels":
+            return replays.PixelReplay(self.replay_size)
+        return replays.StateReplay(self.replay_size)
 
-        surface = pygame.surface.Surface((width, height))
-        self.draw(surface)
-        self.replay[self.replay_pointer] = surface
-        
+    def replay_snapshot(self):
+        if self.replay is None:
+            self.replay = self.make_replay()
+        self.replay.record(self.replay_pointer, self)
         self.replay_pointer = (self.replay_pointer + 1) % len(self.replay)
     
     def get_replay(self):
-        return [self.replay, self.replay_pointer]
+        # the replay and the slot of its newest frame
+        if self.replay is None:
+            self.replay = self.make_replay()
+        return [self.replay, (self.replay_pointer - 1) % len(self.replay)]
 
     def reset_replay(self):
-        self.replay = [None] * 150
+        self.replay = None
         self.replay_pointer = 0
 
     def surface_snapshot(self):
-        window = pygame.display.get_surface()
-        width = window.get_width()
-        height = window.get_height()
-
-        surface = pygame.surface.Surface((width, height))
+        surface = surfaces.borrow_window_sized()
+        surface.fill(palette.BLACK)
 
         self.draw(surface)
         return surface
@@ -91,6 +309,18 @@ class Scene:
         for obj in self.objects.values():
             obj.draw(surface)
 
+    def dirty_rects(self):
+        rects = []
+        for obj in self.objects.values():
+            rects.extend(obj.dirty_rects())
+        return rects
+
+    def interpolate(self, alpha):
+        # objects that move smoothly are drawn between their last two ticks
+        for obj in self.objects.values():
+            if hasattr(obj, "interpolate"):
+                obj.interpolate(alpha)
+
     def process_frame(self):
         for event in pygame.event.get():
             self.check_quit(event)
@@ -101,40 +331,201 @@ class Scene:
             sys.exit()
 
 
+class GameScene(Scene):
+    # a scene playing a game that can save and load its state, for rollback,
+    # recording and replays. Subclasses make self.game and define
+    # simulate(inputs), one game tick from inputs as the scene reads them,
+    # returning True when the round ends
+    def __init__(self, data):
+        super().__init__(data)
+        # the game's own rng starts from this, so loading a snapshot never
+        # touches the shared random module
+        self.game_seed = random.randrange(1 << 32)
+        # saves each tick played to disk, when the scene is being recorded
+        self.recorder = None
+        # the number of small ints a tick's inputs take in a recording
+        self.input_width = 0
+
+    def new_snapshot(self):
+        return self.game.new_snapshot()
+
+    def save_state(self, snapshot):
+        self.game.save(snapshot)
+
+    def load_state(self, snapshot):
+        self.game.load(snapshot)
+        self.full_redraw = True
+
+    def play(self, inputs):
+        # simulate, recording the tick first when the scene is being recorded
+        if self.recorder is not None:
+            self.recorder.record(self, inputs)
+        ended = self.simulate(inputs)
+        if ended and self.recorder is not None:
+            self.recorder.round_over()
+        return ended
+
+    def encode_inputs(self, inputs):
+        # a tick's inputs as input_width small ints, and back again
+        return ()
+
+    def decode_inputs(self, codes):
+        return None
+
+    def seed(self):
+        # the seed the game's rng started from
+        return self.game_seed
+
+    def resimulate(self, ticks, snapshots=None):
+        # play ticks, a list of inputs, without drawing or recording replays,
+        # saving the state before each tick into snapshots where one is given;
+        # stops after a tick that ends the round and returns how many were played
+        if snapshots is None:
+            snapshots = [None] * len(ticks)
+        for played, (inputs, snapshot) in enumerate(zip(ticks, snapshots), 1):
+            if snapshot is not None:
+                self.save_state(snapshot)
+            if self.simulate(inputs):
+                return played
+        return len(ticks)
+
+
 class Replay(Scene):
     def __init__(self, data):
         super().__init__(data)
-        self.fps = 30
+        # last_frame is the slot of the newest frame, which is played too
         self.replay, self.last_frame, self.next_scene = self.data
-        self.replay_pointer = self.start_frame(self.replay, self.last_frame)
-        self.frame = self.replay[self.replay_pointer]
+        # replays kept on disk play back at the rate they were recorded at
+        self.fps = getattr(self.replay, "fps", 30)
+
+        # frames from the first one, counted in fractions below 1x; only the
+        # frame it lands on is drawn, so faster speeds skip the rest
+        self.first_frame = self.start_frame(self.replay, self.last_frame)
+        self.length = (self.last_frame - self.first_frame) % len(self.replay)
+        self.position = 0
+        self.speed = REPLAY_SPEEDS.index(1)
+        self.direction = 1
+        self.paused = False
+        self.replay_pointer = self.first_frame
         
         self.flash = (60, 120)
-        width = pygame.display.get_surface().get_width()
+        width, height = pygame.display.get_surface().get_size()
         self.text = UI.GameText("INSTANT REPLAY", (width // 2, 40), palette.GREEN,
                                 40, self.flash)
+        self.speed_text = UI.GameText("", (8, 8), palette.WHITE, 20)
+        self.timeline = pygame.Rect(8, height - 46, width - 16, 6)
+        self.update_speed_text()
+
+        self.export = None
+        self.export_text = UI.GameText("G: save as GIF   P: save as PNGs", (8, height - 30), 
+                                       palette.WHITE, 20)
     
     def process_frame(self):
         for event in pygame.event.get():
             self.check_quit(event)
-
-        if self.frame is None or self.replay_pointer == self.last_frame:
+            if event.type == pygame.KEYUP and event.key in EXPORT_KEYS and self.export is None:
+                self.start_export(EXPORT_KEYS[event.key])
+            elif event.type == pygame.KEYUP and self.export is None:
+                self.control(event.key)
+
+        if self.export is not None:
+            self.export.poll()
+            self.export_text.text = self.export.status()
+            # while the encoder is behind, stay on this frame rather than queue more;
+            # frames go out from the first to the last, which is offered before leaving
+            if self.export.wants_frames() and not self.capture():
+                return None
+
+        if self.position >= self.length and self.direction > 0 and not self.paused:
+            if self.export is not None and not (self.export.done or self.export.error):
+                return None
             return self.next_scene
 
-        self.replay_pointer = (self.replay_pointer + 1) % len(self.replay)
-        self.frame = self.replay[self.replay_pointer]
+        if not self.paused:
+            self.seek(self.position + REPLAY_SPEEDS[self.speed] * self.direction)
+            # rewinding stops at the first frame rather than leaving
+            if self.position == 0 and self.direction < 0:
+                self.paused = True
+                self.update_speed_text()
+
+    def control(self, key):
+        # space pauses, the arrows step a frame or change speed, R plays
+        # backwards, and the number keys jump through the replay in tenths
+        if key == pygame.K_SPACE:
+            self.paused = not self.paused
+        elif key in (pygame.K_LEFT, pygame.K_RIGHT):
+            self.paused = True
+            self.seek(int(self.position) + (1 if key == pygame.K_RIGHT else -1))
+        elif key == pygame.K_UP:
+            self.speed = min(self.speed + 1, len(REPLAY_SPEEDS) - 1)
+        elif key == pygame.K_DOWN:
+            self.speed = max(self.speed - 1, 0)
+        elif key == pygame.K_r:
+            self.direction = -self.direction
+            self.paused = False
+        elif key == pygame.K_HOME:
+            self.seek(0)
+        elif key == pygame.K_END:
+            self.seek(self.length)
+            self.paused = True
+        elif pygame.K_0 <= key <= pygame.K_9:
+            self.seek(self.length * (key - pygame.K_0) // 10)
+        else:
+            return
+        self.update_speed_text()
+
+    def seek(self, position):
+        # only moves the pointer; the frame is fetched when it is drawn
+        self.position = min(max(position, 0), self.length)
+        self.replay_pointer = (self.first_frame + int(self.position)) % len(self.replay)
+
+    def update_speed_text(self):
+        if self.paused:
+            self.speed_text.text = "PAUSED"
+        else:
+            self.speed_text.text = f"{'-' if self.direction < 0 else ''}{REPLAY_SPEEDS[self.speed]:g}x"
+
+    def start_export(self, kind):
+        # play the replay again from the start, handing each frame to the encoder
+        import export
+
+        self.seek(0)
+        self.speed = REPLAY_SPEEDS.index(1)
+        self.direction = 1
+        self.paused = False
+        self.update_speed_text()
+        # every frame from the first to the last, both included
+        total = self.length + 1 if self.replay.has_frame(self.first_frame) else 0
+        size = pygame.display.get_surface().get_size()
+        self.export = export.Exporter(kind, total, self.fps, size)
+
+    def capture(self):
+        surface = surfaces.borrow_window_sized()
+        surface.fill(palette.BLACK)
+        self.replay.draw(self.replay[self.replay_pointer], surface)
+        taken = self.export.offer(surface)
+        surfaces.pool.give_back(surface)
+        return taken
 
     def draw(self):
-        if self.frame:
-            window = pygame.display.get_surface()
-            window.blit(self.frame, (0, 0))
+        window = pygame.display.get_surface()
+        if self.replay.has_frame(self.replay_pointer):
+            self.replay.draw(self.replay[self.replay_pointer], window)
         self.text.draw()
+        self.speed_text.draw()
+        self.export_text.draw()
+
+        pygame.draw.rect(window, palette.WHITE, self.timeline, 1)
+        done = self.timeline.copy()
+        done.width = int(self.timeline.width * self.position / max(self.length, 1))
+        pygame.draw.rect(window, palette.WHITE, done)
     
     def start_frame(self, replay, pointer):
         start_frame = (pointer + 1) % len(replay)
         
-        if replay[start_frame] is None:
-            start_frame = 0
+        # skip slots that were never written or can no longer be decoded
+        while start_frame != pointer and not replay.has_frame(start_frame):
+            start_frame = (start_frame + 1) % len(replay)
 
         return start_frame
 
@@ -165,6 +556,7 @@ class Countdown(Scene):
             self.frame = 0 
 
         if self.line >= len(self.lines):
+            surfaces.pool.give_back(self.background)
             return self.next_scene
         
         self.frame += 1
@@ -180,6 +572,7 @@ class Menu(Scene):
         super().__init__(data)
         self.objects = []
         self.buttons = []
+        self.idle = True
     
     def setup_ui(self):
         pass
@@ -187,6 +580,9 @@ class Menu(Scene):
     def draw(self):
         for obj in self.objects:
             obj.draw()
+
+    def interpolate(self, alpha):
+        pass
     
     def process_frame(self):
         for event in pygame.event.get():
@@ -198,6 +594,9 @@ class Menu(Scene):
         message = UI.Text(self.text, self.text_color)
         self.objects.append((message))
     
+    def back_signal(self):
+        return ["main_menu", MainMenu, None, True, True]
+
     def add_button(self, text, signal, alignment):
         button = UI.Button(None, text, signal)
         button.align(*alignment)
@@ -229,465 +628,11 @@ class MainMenu(Menu):
 
     def setup_ui(self):
         self.add_text()
-        self.add_button("PyPong", lambda: ["pong", PongMain, None], (2, 0, 6, 5))
-        self.add_button("Snake", lambda: ["snake", SnakeMain, None], (2, 1, 6, 5))
-
-
-class PongMain(Menu):
-    def __init__(self, data):
-        super().__init__(data)
-        self.text = ["PyPong"]
-        self.text_color = palette.GREEN
-        
-        self.setup_ui()
-    
-    def setup_ui(self):
-        self.add_text()
-
-        self.add_button("play", lambda: ["pong_double", PongDouble, None], (2, 0, 6, 5))
-        self.add_button("back", lambda: ["main_menu", MainMenu, None, True, True], (2, 1, 6, 5))
-
-
-class PongDouble(Scene):
-    def __init__(self, data):
-        super().__init__(data)
-
-        self.win_score = 10
-        self.countdown = True
-
-        self.setup_game()
-
-    def setup_game(self):
-        # get display dimensions
-        window = pygame.display.get_surface()
-        width = window.get_width()
-        height = window.get_height()
-
-        # scores
-        self.score_left = 0
-        self.score_right = 0
-        
-        # set controls
-        self.l_up = pygame.K_w
-        self.l_down = pygame.K_a
-        self.r_up = pygame.K_RIGHTBRACKET
-        self.r_down = pygame.K_QUOTE
-
-        # make paddles
-        x_buffer = 8
-        paddle_height = 70
-        paddle_width = 10
-        self.objects["left"] = pong.Paddle([x_buffer, height // 2], palette.GREEN, paddle_width, 
-                                      paddle_height)
-        self.objects["right"] = pong.Paddle([width - x_buffer - paddle_width, height // 2], 
-                                       palette.GREEN, paddle_width, paddle_height)
-
-        # make ball
-        self.objects["ball"] = pong.Ball(palette.RED)
-
-        # score text
-        font_size = 40
-        y_buffer = 5
-        score_left_pos = (x_buffer, y_buffer)
-        score_right_pos = (width - font_size * 2, y_buffer)
-        self.objects["left_score"] = UI.GameText(str(self.score_left), score_left_pos, 
-                                                 palette.GREEN, font_size)
-        self.objects["right_score"] = UI.GameText(str(self.score_right), score_right_pos, 
-                                                  palette.GREEN, font_size)
-
-        # make lines
-        text_buffer = 40
-        bottom_buffer = 10
-        self.objects["top"] = pong.Wall(bottom_buffer + text_buffer, palette.WHITE)
-        self.objects["bottom"] = pong.Wall(height - bottom_buffer , palette.WHITE)
-
-    def process_frame(self):
-        if self.countdown:
-            self.countdown = False
-            return self.end_round()
-
-        ball = self.objects["ball"]
-        left = self.objects["left"]
-        right = self.objects["right"]
-        top = self.objects["top"]
-        bottom = self.objects["bottom"]
-        left_text = self.objects["left_score"]
-        right_text = self.objects["right_score"]
-
-        window_width = pygame.display.get_surface().get_width()
-
-        for event in pygame.event.get():
-            self.check_quit(event)
-                
-        key_list = pygame.key.get_pressed()
-        if key_list[self.l_up]:
-            left.up()
-        elif key_list[self.l_down]:
-            left.down()
-
-        if key_list[self.r_up]:
-            right.up()
-        elif key_list[self.r_down]:
-            right.down()
-            
-        ball.move()
-        if ball.x < 0 or ball.x > window_width:
-            return self.end_round()
-
-        if ball.y < top.y:
-            ball.y = top.y + 1
-            ball.direction[1] *= -1
-            
-        elif ball.y > bottom.y:
-            ball.y = bottom.y - 1
-            ball.direction[1] *= -1
-
-        if ball.rect.colliderect(left.rect):
-            ball.redirect(*left.bounce(ball.x, ball.y - ball.height // 2, "left"))
-
-        elif ball.rect.colliderect(right.rect):
-            ball.redirect(*right.bounce(ball.x, ball.y - ball.height // 2, "right"))
-    
-    def end_round(self):
-        if self.objects["ball"].x < 0:
-            self.score_right += 1
-            self.objects["ball"].reset("left")
-            self.objects["right_score"].text = str(self.score_right)
-
-        else:
-            self.score_left += 1
-            self.objects["ball"].reset("right")
-            self.objects["left_score"].text = str(self.score_left)
-        
-        if self.score_left >= self.win_score or self.score_right >= self.win_score:
-            return ("pong_end", PongEnd, (self.score_left, self.score_right), True)
-
-        self.objects["left"].reset()
-        self.objects["right"].reset()
-
-        back = ("pong_double", PongDouble, self.data, True)
-        countdown = ("countdown", Countdown, 
-                     (self.surface_snapshot(), [["Ready..."], ["Go!"]], 30, back))
-                     
-        return countdown
-
-
-class PongEnd(Menu):
-    def __init__(self, data):
-        super().__init__(data)
-        self.score_left, self.score_right = self.data
-
-        if self.score_left > self.score_right:
-            winner = "left"
-        else:
-            winner = "right"
-
-        self.text = [f"{winner} side sucked less than the other side", 
-                     f"Final score: {self.score_left} - {self.score_right}",
-                     "press enter to continue"]
-        self.text_color = palette.WHITE
-
-        self.setup_ui()
-
-    def setup_ui(self):
-        self.add_text()
-    
-    def process_frame(self):
-        for event in pygame.event.get():
-            self.check_quit(event)
-            
-            if event.type == pygame.KEYUP:
-                if event.key == pygame.K_RETURN:
-                    return ("pong_main", PongMain, None, True)
-
-
-class SnakeMain(Menu):
-    def __init__(self, data):
-        super().__init__(data)
-        self.text = ["SNAKE"]
-        self.text_color = palette.GREEN
-        self.setup_ui()
-    
-    def setup_ui(self):
-        self.add_text()
-        self.add_button("Slow", self.speed_signal(20, 0), (3, 0, 6, 4))
-        self.add_button("Medium", self.speed_signal(40, 1), (3, 1, 6, 4))
-        self.add_button("Fast", self.speed_signal(70, 2), (3, 2, 6, 4))
-        self.add_button("1p", self.start_game_signal("1p"), (3, 0, 6, 5))
-        self.add_button("2p", self.start_game_signal("2p"), (3, 1, 6, 5))
-        self.add_button("Back", lambda: ["main_menu", MainMenu, None, True, True], (3, 2, 6, 5))
-        
-        self.buttons[1].clicked()
+        for i, (title, name, module, scene) in enumerate(games):
+            self.add_button(title, self.game_signal(name, module, scene), (2, i, 6, 5))
 
-    def speed_signal(self, fps, num):
+    def game_signal(self, name, module, scene):
         def signal():
-            self.fps = fps
-            self.buttons[num].button_color = palette.GREEN
-            whites = [0, 1, 2]
-            whites.remove(num)
-            for white in whites:
-                self.buttons[white].button_color = palette.WHITE
+            return [name, load_scene(module, scene), None]
 
         return signal
-    
-    def start_game_signal(self, mode):
-        if mode == "1p":
-            name = "snake_single"
-            game = SnakeSingle
-        elif mode == "2p":
-            name = "snake_double"
-            game = SnakeDouble
-
-        def signal():
-            return (name, game, self.fps)
-
-        return signal
-        
-
-class SnakeSingle(Scene):
-    def __init__(self, data):
-        super().__init__(data)
-        self.fps = self.data
-        self.block_size = 20
-        
-        self.setup_game()
-    
-    def setup_game(self):
-        # reset
-        window = pygame.display.get_surface()
-        window_width = window.get_width()
-        window_height = window.get_height()
-
-        self.objects["snake"] = snake.Snake([window_width // 2, window_height // 2], palette.GREEN, 
-                                 self.block_size)
-        self.objects["food"] = self.spawn_food()
-        self.score = 0
-    
-    def spawn_food(self):
-        window = pygame.display.get_surface()
-        window_width = window.get_width()
-        window_height = window.get_height()
-
-        x = random.randint(1, window_width - self.block_size)
-        y = random.randint(1, window_height - self.block_size)
-
-        return snake.Food((x, y), palette.RED, self.block_size)
-
-    def process_frame(self):
-        window = pygame.display.get_surface()
-        window_width = window.get_width()
-        window_height = window.get_height()
-
-        for event in pygame.event.get():
-            self.check_quit(event)
-
-        for rect in self.objects["snake"].tail_rects:
-            if self.objects["snake"].head_rect.colliderect(rect):
-                return self.lose()
-        
-        x = self.objects["snake"].pos[0]
-        y = self.objects["snake"].pos[1]
-        if x > window_width or x < 0 or y > window_height or y < 0:
-            return self.lose()
-        
-        if self.objects["snake"].head_rect.colliderect(self.objects["food"].rect):
-            grow = True
-            self.objects["food"] = self.spawn_food()
-            self.score += 1
-        else:
-            grow = False
-            
-        key_list = pygame.key.get_pressed()
-        if key_list[pygame.K_UP] or key_list[pygame.K_w]:
-            if self.objects["snake"].direction != pygame.K_DOWN:
-                self.objects["snake"].direction = pygame.K_UP
-                
-        elif key_list[pygame.K_DOWN] or key_list[pygame.K_s]:
-            if self.objects["snake"].direction != pygame.K_UP:
-                self.objects["snake"].direction = pygame.K_DOWN
-                
-        elif key_list[pygame.K_LEFT] or key_list[pygame.K_a]:
-            if self.objects["snake"].direction != pygame.K_RIGHT:
-                self.objects["snake"].direction = pygame.K_LEFT
-
-        elif key_list[pygame.K_RIGHT] or key_list[pygame.K_d]:
-            if self.objects["snake"].direction != pygame.K_LEFT:
-                self.objects["snake"].direction = pygame.K_RIGHT
-
-        self.objects["snake"].move(grow)
-
-    def lose(self):
-        return ("snake_end", SnakeEnd, self.score, True)
-
-
-class SnakeDouble(Scene):
-    def __init__(self, data):
-        super().__init__(data)
-        self.fps = self.data
-        self.block_size = 20
-
-        self.countdown = True
-        self.countdown_text = [["Ready"], ["Go!"]]
-        self.countdown_length = 120
-
-        self.setup_game()
-    
-    def setup_game(self):
-        window = pygame.display.get_surface()
-        window_width = window.get_width()
-        window_height = window.get_height()
-
-        buffer = 5 * self.block_size
-        self.p1_starting_pos = (buffer, buffer)
-        self.p2_starting_pos = (window_width - buffer, window_height - buffer)
-
-        self.objects["p1"] = snake.Snake(self.p1_starting_pos, palette.GREEN, self.block_size)
-        self.objects["p2"] = snake.Snake(self.p2_starting_pos, palette.BLUE, self.block_size)
-        self.objects["food"] = self.spawn_food()
-
-        self.objects["p1"].direction = pygame.K_DOWN
-        self.objects["p2"].direction = pygame.K_UP
-
-        self.p1_controls = [pygame.K_w, pygame.K_d, pygame.K_s, pygame.K_a]
-        self.p2_controls = [pygame.K_UP, pygame.K_RIGHT, pygame.K_DOWN, pygame.K_LEFT]
-
-        self.p1_score = 0
-        self.p2_score = 0
-
-    def process_frame(self):
-        self.replay_snapshot()
-
-        if self.p1_score >= 3 or self.p2_score >= 3:
-            return self.match()
-
-        if self.countdown:
-            back = ("snake_double", SnakeDouble, self.data, True)
-            self.countdown = False
-            return ("countdown", Countdown, (self.surface_snapshot(), self.countdown_text, 
-                    self.countdown_length, back))
-            
-        window = pygame.display.get_surface()
-        window_width = window.get_width()
-        window_height = window.get_height()
-
-        p1 = self.objects["p1"]
-        p2 = self.objects["p2"]
-        food = self.objects["food"]
-
-        for event in pygame.event.get():
-            self.check_quit(event)
-        
-        snakes = [p1, p2]
-        controls = [self.p1_controls, self.p2_controls]
-        key_list = pygame.key.get_pressed()
-        for i, (snake, controls) in enumerate(zip(snakes, controls)):
-            other_snake = not i
-            for rect in snake.tail_rects:
-                if snakes[other_snake].head_rect.colliderect(rect):
-                    return self.win(i)
-
-            x = snake.pos[0]
-            y = snake.pos[1]
-            if x > window_width or x < 0 or y > window_height or y < 0:
-                return self.win(other_snake)
-            
-            if snake.head_rect.colliderect(food.rect):
-                grow = True
-                self.objects["food"] = self.spawn_food()
-            else:
-                grow = False
-        
-            if key_list[controls[0]]:
-                if snake.direction != pygame.K_DOWN:
-                    snake.direction = pygame.K_UP
-
-            elif key_list[controls[1]]:
-                if snake.direction != pygame.K_LEFT:
-                    snake.direction = pygame.K_RIGHT
-
-            elif key_list[controls[2]]:
-                if snake.direction != pygame.K_UP:
-                    snake.direction = pygame.K_DOWN
-                    
-            elif key_list[controls[3]]:
-                if snake.direction != pygame.K_RIGHT:
-                    snake.direction = pygame.K_LEFT
-
-            snake.move(grow)
-
-    def spawn_food(self):
-        window = pygame.display.get_surface()
-        window_width = window.get_width()
-        window_height = window.get_height()
-
-        x = random.randint(1, window_width - self.block_size)
-        y = random.randint(1, window_height - self.block_size)
-
-        return snake.Food((x, y), palette.RED, self.block_size)
-    
-    def win(self, winner):
-        if winner:
-            winner = "blue"
-            self.p2_score += 1
-        else:
-            winner = "green"
-            self.p1_score += 1
-
-        back = ("snake_double", SnakeDouble, self.data, True)
-        replay = ("replay", Replay, self.get_replay() + [back], True)
-        countdown = ("countdown", Countdown, 
-                     (self.surface_snapshot(), [[f"{winner} wins!"]], 90, replay))
-                     
-        
-        self.countdown = True
-        self.objects["p1"].reset(self.p1_starting_pos, pygame.K_DOWN)
-        self.objects["p2"].reset(self.p2_starting_pos, pygame.K_UP)
-        self.objects["food"] = self.spawn_food()
-        
-        self.reset_replay()
-        
-        return countdown
-
-    def match(self):
-        window = pygame.display.get_surface()
-        width = window.get_width()
-        height = window.get_height()
-
-        if self.p1_score > self.p2_score:
-            winner = "green"
-        else:
-            winner = "blue"
-        
-        surface = pygame.surface.Surface((width, height))
-        surface.fill(palette.BLACK)
-        
-        line1 = [f"{winner} wins the set!"]
-        line2 = ["Final Score:", f"green {self.p1_score} - {self.p2_score} blue"]
-
-        back = ("snake_main", SnakeMain, None, True)
-        countdown = ("countdown", Countdown, (surface, [line1, line2], 120, back), True)
-
-        return countdown
-        
-
-class SnakeEnd(Menu):
-    def __init__(self, data):
-        super().__init__(data)
-        self.text = ["LOSER!", f"Score: {self.data}", "Press ENTER to continue"]
-        self.text_color = palette.WHITE
-
-        self.setup_ui()
-
-    def setup_ui(self):
-        self.add_text()
-    
-    def process_frame(self):
-        for event in pygame.event.get():
-            self.check_quit(event)
-            
-            if event.type == pygame.KEYUP:
-                if event.key == pygame.K_RETURN:
-                    return ("snake_main", SnakeMain, None, True)
-    
-
-
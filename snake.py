@@ -1,69 +1,325 @@
+import array
+import collections
+import colorsys
+import dirty
+import itertools
+import palette
 import pygame
+import random
+import rollback
+import spatial
+import struct
+import zlib
+
+class Grid:
+    # occupancy counts per cell; positions are floor-divided by block_size
+    def __init__(self, width, height, block_size):
+        self.block_size = block_size
+        # a head may sit one block past the right or bottom edge for a tick
+        self.cols = width // block_size + 1
+        self.rows = height // block_size + 1
+        self.cells = bytearray(self.cols * self.rows)
+
+    def index(self, pos):
+        col = pos[0] // self.block_size
+        row = pos[1] // self.block_size
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return row * self.cols + col
+        return None
+
+    def add(self, pos):
+        index = self.index(pos)
+        if index is not None:
+            self.cells[index] += 1
+
+    def remove(self, pos):
+        index = self.index(pos)
+        if index is not None:
+            self.cells[index] -= 1
+
+    def occupied(self, pos):
+        index = self.index(pos)
+        return index is not None and self.cells[index] > 0
+
+    def clear(self):
+        self.cells = bytearray(self.cols * self.rows)
+
+
+class FreeCells:
+    # swap-remove array of free cells plus each cell's slot in it, -1 when taken
+    def __init__(self, count):
+        self.cells = array.array("i", range(count))
+        self.slots = array.array("i", range(count))
+
+    def __len__(self):
+        return len(self.cells)
+
+    def take(self, cell):
+        slot = self.slots[cell]
+        if slot < 0:
+            return
+
+        last = self.cells.pop()
+        if last != cell:
+            self.cells[slot] = last
+            self.slots[last] = slot
+        self.slots[cell] = -1
+
+    def release(self, cell):
+        if self.slots[cell] >= 0:
+            return
+
+        self.slots[cell] = len(self.cells)
+        self.cells.append(cell)
+
+    def sample(self, rng=random):
+        if not self.cells:
+            return None
+        return self.cells[rng.randrange(len(self.cells))]
+
+
+class Board:
+    # arena-wide occupancy, so food can be placed on a free cell in O(1)
+    def __init__(self, width, height, block_size):
+        self.block_size = block_size
+        self.cols = width // block_size
+        self.rows = height // block_size
+
+        self.counts = bytearray(self.cols * self.rows)
+        self.free = FreeCells(self.cols * self.rows)
+        self.food = {}
+        self.food_cells = {}
+
+    def cell(self, pos):
+        col = pos[0] // self.block_size
+        row = pos[1] // self.block_size
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return row * self.cols + col
+        return None
+
+    def position(self, cell):
+        return ((cell % self.cols) * self.block_size, (cell // self.cols) * self.block_size)
+
+    def occupy(self, pos):
+        cell = self.cell(pos)
+        if cell is not None:
+            self.counts[cell] += 1
+            self.free.take(cell)
+
+    def vacate(self, pos):
+        cell = self.cell(pos)
+        if cell is not None:
+            self.counts[cell] -= 1
+            if self.counts[cell] == 0 and cell not in self.food:
+                self.free.release(cell)
+
+    def place_food(self, key, rng=random):
+        self.remove_food(key)
+
+        cell = self.free.sample(rng)
+        if cell is None:
+            return None
+
+        self.free.take(cell)
+        self.food[cell] = key
+        self.food_cells[key] = cell
+        return self.position(cell)
+
+    def remove_food(self, key):
+        cell = self.food_cells.pop(key, None)
+        if cell is None:
+            return
+
+        del self.food[cell]
+        if self.counts[cell] == 0:
+            self.free.release(cell)
+
+
+OPPOSITE = {pygame.K_UP: pygame.K_DOWN, pygame.K_DOWN: pygame.K_UP, 
+            pygame.K_LEFT: pygame.K_RIGHT, pygame.K_RIGHT: pygame.K_LEFT}
+STEPS = {pygame.K_UP: (0, -1), pygame.K_DOWN: (0, 1), 
+         pygame.K_LEFT: (-1, 0), pygame.K_RIGHT: (1, 0)}
+
+# MultiGame.step result when the last snakes die together
+DRAW = -1
+
+# directions as stored in snapshots
+DIRECTION_CODES = [None, pygame.K_UP, pygame.K_RIGHT, pygame.K_DOWN, pygame.K_LEFT]
+# a tail cell as get_state packs it, an (x, y) pair of native int16s
+TAIL_CELL = struct.Struct("=hh")
+
+
+def player_colors(count):
+    # evenly spread hues, keeping clear of the red used for food
+    colors = []
+    for i in range(count):
+        hue = (0.1 + 0.8 * i / max(count - 1, 1)) % 1.0
+        r, g, b = colorsys.hsv_to_rgb(hue, 1.0, 1.0)
+        colors.append((round(r * 255), round(g * 255), round(b * 255)))
+    return colors
+
 
 class Snake:
-    def __init__(self, pos, color, block_size):
+    def __init__(self, pos, color, block_size, arena, board=None):
         self.pos = pos
         self.color = color
         self.block_size = block_size
+        self.arena = arena
+        self.board = board
+        if self.board is not None:
+            self.board.occupy(self.pos)
 
         self.head_rect = pygame.Rect(pos[0], pos[1],
             self.block_size, self.block_size)
 
-        self.tail_rects = []
+        self.grid = Grid(self.arena[0], self.arena[1], self.block_size)
+
+        self.tail = collections.deque()
         self.direction = None
+        # cells the snake has left since dirty_rects last asked; None until
+        # something first asks, so games run without drawing don't pile them up
+        self.vacated = None
+        self.removed = False
         
-    def move(self, grow):
+    def next_pos(self):
+        # where the head goes on the next move
+        step = STEPS.get(self.direction)
+        if step is None:
+            return self.pos
+        return (self.pos[0] + step[0] * self.block_size, self.pos[1] + step[1] * self.block_size)
 
-        if self.direction == pygame.K_UP:
-            x = self.pos[0]
-            y = self.pos[1] - self.block_size
-            self.pos = (x, y)
+    def tail_end(self):
+        # the cell a move without growing frees up
+        if self.tail:
+            return self.tail[0]
+        return self.pos
 
-        elif self.direction == pygame.K_DOWN:
-            x = self.pos[0]
-            y = self.pos[1] + self.block_size
-            self.pos = (x, y)
-        
-        elif self.direction == pygame.K_LEFT:
-            x = self.pos[0] - self.block_size
-            y = self.pos[1]
-            self.pos = (x, y)
-        
-        elif self.direction == pygame.K_RIGHT:
-            x = self.pos[0] + self.block_size
-            y = self.pos[1]
-            self.pos = (x, y)
+    def move(self, grow):
+        head = (self.pos[0], self.pos[1])
+        self.pos = self.next_pos()
         
         if self.direction is not None:
-            self.tail_rects.append(self.head_rect)
+            self.tail.append(head)
+            self.grid.add(head)
+            if self.board is not None:
+                self.board.occupy(self.pos)
             if not grow:
-                self.tail_rects.pop(0)
+                end = self.tail.popleft()
+                self.grid.remove(end)
+                if self.board is not None:
+                    self.board.vacate(end)
+                if self.vacated is not None:
+                    self.vacated.append(pygame.Rect(end[0], end[1], self.block_size, self.block_size))
             self.head_rect = pygame.Rect(self.pos[0], self.pos[1], self.block_size, self.block_size)
 
+    def steer(self, direction):
+        # no reversing straight back into the tail
+        if direction is not None and self.direction != OPPOSITE[direction]:
+            self.direction = direction
+
+    def in_tail(self, pos):
+        return self.grid.occupied(pos)
+
+    def get_state(self):
+        # tail packed as (x, y) int16 pairs to keep replays small
+        tail = array.array("h")
+        for x, y in self.tail:
+            tail.append(x)
+            tail.append(y)
+        return (self.pos, self.direction, tail.tobytes(), self.removed)
+
+    def set_state(self, state):
+        # refills the tail, grid and head in place; copies have their own
+        self.pos, self.direction, packed, self.removed = state
+        for pos in self.tail:
+            self.grid.remove(pos)
+        self.tail.clear()
+        for pos in TAIL_CELL.iter_unpack(packed):
+            self.tail.append(pos)
+            self.grid.add(pos)
+        self.head_rect.topleft = self.pos
+
+    def __copy__(self):
+        # replays and spectators draw from copies made once and then given
+        # states, so a copy gets its own containers rather than the live ones
+        clone = type(self).__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        clone.tail = collections.deque(self.tail)
+        clone.grid = Grid(self.arena[0], self.arena[1], self.block_size)
+        clone.grid.cells[:] = self.grid.cells
+        clone.head_rect = self.head_rect.copy()
+        clone.vacated = None
+        return clone
+
+    def dirty_rects(self):
+        # only the new head and the cells the tail left behind change per move
+        rects = self.vacated or []
+        if not self.removed:
+            rects += dirty.changed(self, self.head_rect.copy())
+        self.vacated = []
+        return rects
+
     def draw(self, surface=None):
+        if self.removed:
+            return
+
         if surface is None:
             window = pygame.display.get_surface()
         else:
             window = surface
         
         pygame.draw.rect(window, self.color, self.head_rect)
-        for rect in self.tail_rects:
-            pygame.draw.rect(window, self.color, rect)
+        for x, y in self.tail:
+            pygame.draw.rect(window, self.color, (x, y, self.block_size, self.block_size))
     
+    def remove(self):
+        # take the snake off the board until its next reset
+        for pos in [self.pos] + list(self.tail):
+            if self.board is not None:
+                self.board.vacate(pos)
+            if self.vacated is not None:
+                self.vacated.append(pygame.Rect(pos[0], pos[1], self.block_size, self.block_size))
+
+        self.tail = collections.deque()
+        self.grid.clear()
+        self.removed = True
+
     def reset(self, pos, direction):
+        if self.board is not None:
+            # a removed snake has already left the board
+            if not self.removed:
+                self.board.vacate(self.pos)
+                for cell in self.tail:
+                    self.board.vacate(cell)
+            self.board.occupy(pos)
+
         self.pos = pos
         self.direction = direction
-        self.tail_rects = []
+        self.removed = False
+        self.tail = collections.deque()
+        self.grid.clear()
         self.head_rect = pygame.rect.Rect(self.pos[0], self.pos[1], 
                                           self.block_size, self.block_size)
 
 class Food:
-    def __init__(self, pos, color, block_size):
+    def __init__(self, pos, color, block_size, key=None):
         self.pos = pos
         self.color = color
         self.block_size = block_size
+        # the name the game knows this food by
+        self.key = key
 
         self.rect = pygame.rect.Rect(pos[0], pos[1], self.block_size, self.block_size) 
+
+    def get_state(self):
+        return self.pos
+
+    def set_state(self, state):
+        self.pos = state
+        self.rect = pygame.rect.Rect(self.pos[0], self.pos[1], self.block_size, self.block_size)
+
+    def dirty_rects(self):
+        return dirty.changed(self, self.rect.copy())
     
     def draw(self, surface=None):
         if surface is None:
@@ -71,4 +327,425 @@ class Food:
         else:
             window = surface
         pygame.draw.rect(window, self.color, self.rect)
-    
\ No newline at end of file
+    
+
+class SnakeGame:
+    # what the games below share: food placed on their board, kept in objects
+    # under its key and in items, a spatial hash that heads are looked up in
+    def spawn_food(self, key):
+        old = self.objects.get(key)
+        if old is not None:
+            self.items.remove(old)
+
+        pos = self.board.place_food(key, self.rng)
+        if pos is None:
+            self.objects.pop(key, None)
+        else:
+            food = Food(pos, palette.RED, self.block_size, key)
+            self.objects[key] = food
+            self.items.insert(food, food.rect)
+
+    def food_at(self, pos):
+        head = pygame.rect.Rect(pos[0], pos[1], self.block_size, self.block_size)
+        for item in self.items.query(head):
+            return item.key
+        return None
+
+
+class SingleGame(SnakeGame):
+    # pure game logic for one snake; step takes the wanted direction or None
+    def __init__(self, width, height, block_size, food_count=1, rng=None):
+        self.width = width
+        self.height = height
+        self.block_size = block_size
+        self.food_count = food_count
+        # an rng of its own, as loading a snapshot sets its state
+        self.rng = random.Random() if rng is None else rng
+
+        # start on a cell so the head lines up with food
+        self.board = Board(width, height, block_size)
+        start = (width // 2 // block_size * block_size, height // 2 // block_size * block_size)
+        self.snake = Snake(start, palette.GREEN, block_size, (width, height), self.board)
+        self.snakes = [self.snake]
+
+        self.objects = {"snake": self.snake}
+        # food, and anything else heads can run into, for quick lookups
+        self.items = spatial.SpatialHash()
+        for i in range(self.food_count):
+            self.spawn_food(f"food{i}")
+        self.score = 0
+
+    def out_of_bounds(self, pos):
+        return pos[0] > self.width or pos[0] < 0 or pos[1] > self.height or pos[1] < 0
+
+    def step(self, direction):
+        # returns True once the snake has died
+        snake = self.snake
+        if snake.in_tail(snake.pos) or self.out_of_bounds(snake.pos):
+            return True
+
+        eaten = self.food_at(snake.pos)
+        if eaten is not None:
+            grow = True
+            self.spawn_food(eaten)
+            self.score += 1
+        else:
+            grow = False
+
+        snake.steer(direction)
+        snake.move(grow)
+        return False
+
+    def new_snapshot(self):
+        return SnakeSnapshot(self, 1)
+
+    def save(self, snapshot):
+        snapshot.save(self, [self.score])
+
+    def load(self, snapshot):
+        (self.score,) = snapshot.load(self)
+
+
+class DoubleGame(SnakeGame):
+    # pure game logic for two snakes; step takes a wanted direction or None per snake
+    def __init__(self, width, height, block_size, food_count=1, win_score=3, rng=None):
+        self.width = width
+        self.height = height
+        self.block_size = block_size
+        self.food_count = food_count
+        self.win_score = win_score
+        # an rng of its own, as loading a snapshot sets its state
+        self.rng = random.Random() if rng is None else rng
+
+        buffer = 5 * block_size
+        self.starting_pos = [(buffer, buffer), (width - buffer, height - buffer)]
+        self.starting_direction = [pygame.K_DOWN, pygame.K_UP]
+
+        self.board = Board(width, height, block_size)
+        self.snakes = [Snake(self.starting_pos[0], palette.GREEN, block_size, (width, height), 
+                             self.board),
+                       Snake(self.starting_pos[1], palette.BLUE, block_size, (width, height), 
+                             self.board)]
+        for snake, direction in zip(self.snakes, self.starting_direction):
+            snake.direction = direction
+
+        self.objects = {"p1": self.snakes[0], "p2": self.snakes[1]}
+        self.items = spatial.SpatialHash()
+        for i in range(self.food_count):
+            self.spawn_food(f"food{i}")
+        self.scores = [0, 0]
+
+    def out_of_bounds(self, pos):
+        return pos[0] > self.width or pos[0] < 0 or pos[1] > self.height or pos[1] < 0
+
+    def step(self, directions):
+        # returns the index of the round winner, or None while the round goes on
+        snakes = self.snakes
+        for i, (snake, direction) in enumerate(zip(snakes, directions)):
+            other_snake = not i
+            if snake.in_tail(snakes[other_snake].pos):
+                return i
+
+            if self.out_of_bounds(snake.pos):
+                return int(other_snake)
+
+            eaten = self.food_at(snake.pos)
+            if eaten is not None:
+                grow = True
+                self.spawn_food(eaten)
+            else:
+                grow = False
+
+            snake.steer(direction)
+            snake.move(grow)
+        return None
+
+    def win(self, winner):
+        self.scores[winner] += 1
+
+    def new_round(self):
+        for snake, pos, direction in zip(self.snakes, self.starting_pos, self.starting_direction):
+            snake.reset(pos, direction)
+        for i in range(self.food_count):
+            self.spawn_food(f"food{i}")
+
+    def finished(self):
+        return max(self.scores) >= self.win_score
+
+    def new_snapshot(self):
+        return SnakeSnapshot(self, len(self.scores))
+
+    def save(self, snapshot):
+        snapshot.save(self, self.scores)
+
+    def load(self, snapshot):
+        self.scores = list(snapshot.load(self))
+
+
+class MultiGame(SnakeGame):
+    # any number of snakes moving at the same time; step takes a wanted direction
+    # or None per snake, and a round ends when one snake or none is left
+    def __init__(self, width, height, block_size, players, food_count=1, win_score=3, 
+                 rng=None):
+        self.width = width
+        self.height = height
+        self.block_size = block_size
+        self.food_count = food_count
+        self.win_score = win_score
+        # an rng of its own, as loading a snapshot sets its state
+        self.rng = random.Random() if rng is None else rng
+
+        self.board = Board(width, height, block_size)
+        self.starting_pos, self.starting_direction = self.starting_spots(players)
+        self.snakes = []
+        for pos, color in zip(self.starting_pos, player_colors(players)):
+            self.snakes.append(Snake(pos, color, block_size, (width, height), self.board))
+        for snake, direction in zip(self.snakes, self.starting_direction):
+            snake.direction = direction
+        self.alive = [True] * players
+
+        self.objects = {f"p{i + 1}": snake for i, snake in enumerate(self.snakes)}
+        self.items = spatial.SpatialHash()
+        for i in range(self.food_count):
+            self.spawn_food(f"food{i}")
+        self.scores = [0] * players
+
+    def starting_spots(self, players):
+        # half along the top heading down, half along the bottom heading up,
+        # the bottom row shifted so no two start in the same column
+        cols = self.width // self.block_size
+        rows = self.height // self.block_size
+        top = (players + 1) // 2
+        bottom = players - top
+
+        spots = []
+        directions = []
+        for i in range(top):
+            col = (2 * i + 1) * cols // (2 * top + 1)
+            spots.append((col * self.block_size, 3 * self.block_size))
+            directions.append(pygame.K_DOWN)
+        for i in range(bottom):
+            col = (2 * i + 2) * cols // (2 * top + 1)
+            spots.append((col * self.block_size, (rows - 4) * self.block_size))
+            directions.append(pygame.K_UP)
+        return spots, directions
+
+    def out_of_bounds(self, pos):
+        return self.board.cell(pos) is None
+
+    def step(self, directions):
+        # returns the round winner's index, DRAW, or None while the round goes on;
+        # every check is a lookup on the shared board, so a tick costs the same
+        # per snake however many snakes and tail cells there are
+        board = self.board
+        moves = []
+        heads = {}
+        targets = {}
+        freed = {}
+        for i, snake in enumerate(self.snakes):
+            if not self.alive[i]:
+                continue
+
+            snake.steer(directions[i])
+            target = snake.next_pos()
+            cell = board.cell(target)
+            eaten = self.food_at(target)
+            moves.append((i, target, cell, eaten))
+
+            heads[board.cell(snake.pos)] = i
+            targets[cell] = targets.get(cell, 0) + 1
+            # tails that move on this tick make room behind them
+            if eaten is None:
+                end = board.cell(snake.tail_end())
+                freed[end] = freed.get(end, 0) + 1
+
+        dead = []
+        for i, target, cell, eaten in moves:
+            if cell is None or targets[cell] > 1:
+                # off the board, or head on into another snake
+                dead.append(i)
+            elif board.counts[cell] - freed.get(cell, 0) > 0:
+                dead.append(i)
+            else:
+                # two heads passing through each other
+                other = heads.get(cell)
+                if other is not None and other != i:
+                    if board.cell(self.snakes[other].next_pos()) == board.cell(self.snakes[i].pos):
+                        dead.append(i)
+
+        # collisions were judged with every snake in place; now the dead leave
+        for i in dead:
+            self.alive[i] = False
+            self.snakes[i].remove()
+
+        eaten_keys = []
+        for i, target, cell, eaten in moves:
+            if self.alive[i]:
+                self.snakes[i].move(eaten is not None)
+                if eaten is not None:
+                    eaten_keys.append(eaten)
+        for key in eaten_keys:
+            self.spawn_food(key)
+
+        living = [i for i, alive in enumerate(self.alive) if alive]
+        if len(living) > 1:
+            return None
+        if living:
+            return living[0]
+        return DRAW
+
+    def win(self, winner):
+        if winner != DRAW:
+            self.scores[winner] += 1
+
+    def new_round(self):
+        for snake, pos, direction in zip(self.snakes, self.starting_pos, self.starting_direction):
+            snake.reset(pos, direction)
+        self.alive = [True] * len(self.snakes)
+        for i in range(self.food_count):
+            self.spawn_food(f"food{i}")
+
+    def finished(self):
+        return max(self.scores) >= self.win_score
+
+    def new_snapshot(self):
+        return SnakeSnapshot(self, len(self.scores))
+
+    def save(self, snapshot):
+        snapshot.save(self, self.scores)
+
+    def load(self, snapshot):
+        self.scores = list(snapshot.load(self))
+        self.alive = [not snake.removed for snake in self.snakes]
+
+
+class SnakeSnapshot:
+    # one tick of a snake game in buffers sized for a full board, allocated once
+    # and reused for every save; tails are (x, y) int16 pairs and the board's
+    # counts and free cells are copied whole, so food lands where it would have
+    def __init__(self, game, scores):
+        board = game.board
+        cells = board.cols * board.rows
+        self.scores = scores
+        self.food_keys = [f"food{i}" for i in range(game.food_count)]
+
+        # scores; x, y, direction, removed and tail length per snake;
+        # x, y per food, -1 for none; the number of free cells
+        self.layout = struct.Struct("<" + "i" * scores + "hhbBi" * len(game.snakes) +
+                                    "hh" * len(self.food_keys) + "i")
+        self.header = bytearray(self.layout.size)
+        self.tails = [array.array("h", bytes(4 * cells)) for snake in game.snakes]
+        self.grids = [bytearray(len(snake.grid.cells)) for snake in game.snakes]
+        self.counts = bytearray(len(board.counts))
+        self.free = array.array("i", bytes(4 * cells))
+        self.slots = array.array("i", bytes(4 * cells))
+        self.rng_state = None
+
+    def save(self, game, scores):
+        values = list(scores)
+        for snake, tail, grid in zip(game.snakes, self.tails, self.grids):
+            length = len(snake.tail)
+            # straight into the buffer, with no array in between
+            i = 0
+            for x, y in snake.tail:
+                tail[i] = x
+                tail[i + 1] = y
+                i += 2
+            grid[:] = snake.grid.cells
+            values += [snake.pos[0], snake.pos[1], DIRECTION_CODES.index(snake.direction),
+                       snake.removed, length]
+
+        for key in self.food_keys:
+            food = game.objects.get(key)
+            values += food.pos if food is not None else (-1, -1)
+
+        board = game.board
+        free = len(board.free)
+        values.append(free)
+        self.layout.pack_into(self.header, 0, *values)
+
+        self.counts[:] = board.counts
+        self.free[:free] = board.free.cells
+        self.slots[:] = board.free.slots
+        self.rng_state = game.rng.getstate()
+
+    def load(self, game):
+        # returns the scores, which each game keeps in its own way
+        values = self.layout.unpack_from(self.header)
+        scores = values[:self.scores]
+        at = self.scores
+
+        for snake, tail, grid in zip(game.snakes, self.tails, self.grids):
+            x, y, direction, removed, length = values[at:at + 5]
+            at += 5
+            snake.pos = (x, y)
+            snake.direction = DIRECTION_CODES[direction]
+            snake.removed = bool(removed)
+            snake.tail.clear()
+            snake.tail.extend(zip(itertools.islice(tail, 0, 2 * length, 2),
+                                  itertools.islice(tail, 1, 2 * length, 2)))
+            snake.grid.cells[:] = grid
+            snake.head_rect = pygame.rect.Rect(x, y, snake.block_size, snake.block_size)
+
+        board = game.board
+        board.food.clear()
+        board.food_cells.clear()
+        for key in self.food_keys:
+            x, y = values[at:at + 2]
+            at += 2
+            food = game.objects.get(key)
+            if x < 0:
+                if food is not None:
+                    game.items.remove(food)
+                    del game.objects[key]
+                continue
+
+            if food is None:
+                food = Food((x, y), palette.RED, game.block_size, key)
+                game.objects[key] = food
+                game.items.insert(food, food.rect)
+            else:
+                food.set_state((x, y))
+                game.items.move(food, food.rect)
+            cell = board.cell((x, y))
+            board.food[cell] = key
+            board.food_cells[key] = cell
+
+        board.counts[:] = self.counts
+        # the free list is resized in place and then copied over
+        cells = board.free.cells
+        free = values[at]
+        if len(cells) > free:
+            del cells[free:]
+        else:
+            cells.extend(itertools.repeat(0, free - len(cells)))
+        memoryview(cells)[:] = memoryview(self.free)[:free]
+        board.free.slots[:] = self.slots
+        game.rng.setstate(self.rng_state)
+        return scores
+
+    def digest(self):
+        # a checksum of everything but the rng, which only moves when food does
+        values = self.layout.unpack_from(self.header)
+        check = zlib.crc32(self.header)
+        for i, tail in enumerate(self.tails):
+            length = values[self.scores + 5 * i + 4]
+            check = zlib.crc32(memoryview(tail)[:2 * length], check)
+        check = zlib.crc32(self.counts, check)
+        return zlib.crc32(memoryview(self.free)[:values[-1]], check)
+
+    def buffers(self):
+        # every buffer in a fixed order, as bytes views
+        parts = [self.header] + self.tails + self.grids + [self.counts, self.free, self.slots]
+        return [memoryview(part).cast("B") for part in parts]
+
+    def dump(self):
+        # the whole snapshot as bytes, for keeping on disk
+        return b"".join(self.buffers()) + rollback.pack_rng(self.rng_state)
+
+    def restore(self, data):
+        at = 0
+        for view in self.buffers():
+            view[:] = data[at:at + len(view)]
+            at += len(view)
+        self.rng_state = rollback.unpack_rng(data, at)
@@ -0,0 +1,225 @@
+import numpy as np
+
+# actions
+NONE = 0
+UP = 1
+RIGHT = 2
+DOWN = 3
+LEFT = 4
+
+# board cell values; player p's body is BODY + p and its head HEAD + p
+EMPTY = 0
+FOOD = 1
+BODY = 2
+HEAD = 4
+
+# (row, col) step for each action
+DELTAS = np.array([(0, 0), (-1, 0), (0, 1), (1, 0), (0, -1)])
+
+
+class BatchSnake:
+    # count Snake boards stepped in lockstep, gym style; players is 1 (SingleGame
+    # rules) or 2 (DoubleGame rules). A head leaving the visible grid is out.
+    def __init__(self, count, width, height, block_size, players=1, food_count=1,
+                 win_score=3, seed=None):
+        self.count = count
+        self.players = players
+        self.food_count = food_count
+        self.win_score = win_score
+        self.rng = np.random.default_rng(seed)
+
+        self.rows = height // block_size
+        self.cols = width // block_size
+        self.cells = self.rows * self.cols
+
+        # observations are views of this array, never copies
+        self.board = np.zeros((count, self.rows, self.cols), dtype=np.int8)
+        self.flat = self.board.reshape(count, self.cells)
+
+        self.food = np.zeros((count, self.cells), dtype=bool)
+        self.counts = np.zeros((count, players, self.cells), dtype=np.uint8)
+        # each body is a ring of flat cell indices, oldest segment at body_start
+        self.body = np.zeros((count, players, self.cells), dtype=np.int32)
+        self.body_start = np.zeros((count, players), dtype=np.int64)
+        self.body_length = np.zeros((count, players), dtype=np.int64)
+
+        self.heads = np.zeros((count, players, 2), dtype=np.int64)
+        self.direction = np.zeros((count, players), dtype=np.int64)
+        self.scores = np.zeros((count, players), dtype=np.int64)
+
+        if players == 1:
+            self.starting_heads = [(self.rows // 2, self.cols // 2)]
+            self.starting_direction = [NONE]
+        else:
+            self.starting_heads = [(5, 5), (self.rows - 5, self.cols - 5)]
+            self.starting_direction = [DOWN, UP]
+
+        self.reset()
+
+    def reset(self, mask=None):
+        if mask is None:
+            mask = np.ones(self.count, dtype=bool)
+        ids = np.nonzero(mask)[0]
+
+        self.scores[ids] = 0
+        self.new_round(ids)
+        return self.board
+
+    def observe(self, index):
+        return self.board[index]
+
+    def new_round(self, ids):
+        if len(ids) == 0:
+            return
+
+        self.board[ids] = EMPTY
+        self.food[ids] = False
+        self.counts[ids] = 0
+        self.body_start[ids] = 0
+        self.body_length[ids] = 0
+
+        for p in range(self.players):
+            self.heads[ids, p] = self.starting_heads[p]
+            self.direction[ids, p] = self.starting_direction[p]
+            row, col = self.starting_heads[p]
+            self.flat[ids, row * self.cols + col] = HEAD + p
+
+        for i in range(self.food_count):
+            self.spawn_food(ids)
+
+    def on_grid(self, heads):
+        return ((heads[:, 0] >= 0) & (heads[:, 0] < self.rows)
+                & (heads[:, 1] >= 0) & (heads[:, 1] < self.cols))
+
+    def cell_of(self, heads):
+        # off-grid heads map to cell 0; callers mask them with on_grid
+        return np.where(self.on_grid(heads), heads[:, 0] * self.cols + heads[:, 1], 0)
+
+    def spawn_food(self, ids):
+        if len(ids) == 0:
+            return
+
+        occupied = self.counts[ids].any(axis=1) | self.food[ids]
+        for p in range(self.players):
+            heads = self.heads[ids, p]
+            rows = np.nonzero(self.on_grid(heads))[0]
+            occupied[rows, self.cell_of(heads)[rows]] = True
+
+        # uniform over free cells: the highest random score among them
+        scores = self.rng.random((len(ids), self.cells))
+        scores[occupied] = -1
+        cells = scores.argmax(axis=1)
+        placed = scores[np.arange(len(ids)), cells] >= 0
+
+        ids = ids[placed]
+        cells = cells[placed]
+        self.food[ids, cells] = True
+        self.repaint(ids, cells)
+
+    def repaint(self, ids, cells):
+        # priority: heads, then bodies (lower players first), then food
+        value = np.where(self.food[ids, cells], FOOD, EMPTY)
+        for p in reversed(range(self.players)):
+            value = np.where(self.counts[ids, p, cells] > 0, BODY + p, value)
+        for p in reversed(range(self.players)):
+            heads = self.heads[ids, p]
+            at_head = self.on_grid(heads) & (self.cell_of(heads) == cells)
+            value = np.where(at_head, HEAD + p, value)
+        self.flat[ids, cells] = value
+
+    def step(self, actions):
+        # returns (board, rewards, dones, info); finished boards are reset
+        actions = np.asarray(actions).reshape(self.count, self.players)
+        rewards = np.zeros((self.count, self.players))
+        live = np.ones(self.count, dtype=bool)
+        died = np.zeros(self.count, dtype=bool)
+        round_winner = np.full(self.count, -1)
+
+        # players move one after the other, like the scalar games
+        for p in range(self.players):
+            ids = np.nonzero(live)[0]
+            heads = self.heads[ids, p]
+
+            if self.players == 1:
+                hit = self.in_body(ids, p, heads)
+            else:
+                hit = self.in_body(ids, p, self.heads[ids, 1 - p])
+            out = ~self.on_grid(heads)
+
+            if self.players == 1:
+                died[ids[hit | out]] = True
+            else:
+                round_winner[ids[hit]] = p
+                round_winner[ids[out & ~hit]] = 1 - p
+            live[ids[hit | out]] = False
+
+            keep = ~(hit | out)
+            ids = ids[keep]
+            heads = heads[keep]
+            cells = self.cell_of(heads)
+
+            grow = self.food[ids, cells]
+            eaters = ids[grow]
+            self.food[eaters, cells[grow]] = False
+            if self.players == 1:
+                self.scores[eaters, p] += 1
+                rewards[eaters, p] += 1
+            self.spawn_food(eaters)
+
+            self.steer(ids, p, actions[ids, p])
+            self.move(ids, p, heads, cells, grow)
+
+        if self.players == 1:
+            rewards[died, 0] -= 1
+            dones = died
+        else:
+            ended = np.nonzero(round_winner >= 0)[0]
+            winners = round_winner[ended]
+            self.scores[ended, winners] += 1
+            rewards[ended, winners] += 1
+            rewards[ended, 1 - winners] -= 1
+            dones = self.scores.max(axis=1) >= self.win_score
+            self.new_round(ended[~dones[ended]])
+
+        info = {"final_scores": self.scores[dones].copy()}
+        if dones.any():
+            self.reset(dones)
+        return self.board, rewards, dones, info
+
+    def in_body(self, ids, p, heads):
+        on_grid = self.on_grid(heads)
+        return on_grid & (self.counts[ids, p, self.cell_of(heads)] > 0)
+
+    def steer(self, ids, p, actions):
+        # no reversing straight back into the tail
+        current = self.direction[ids, p]
+        opposite = (actions + 1) % 4 + 1
+        allowed = (actions != NONE) & ((current == NONE) | (current != opposite))
+        self.direction[ids, p] = np.where(allowed, actions, current)
+
+    def move(self, ids, p, heads, cells, grow):
+        moving = self.direction[ids, p] != NONE
+        ids = ids[moving]
+        heads = heads[moving]
+        cells = cells[moving]
+        grow = grow[moving]
+
+        # the old head becomes the newest body segment
+        end = (self.body_start[ids, p] + self.body_length[ids, p]) % self.cells
+        self.body[ids, p, end] = cells
+        self.body_length[ids, p] += 1
+        self.counts[ids, p, cells] += 1
+
+        new_heads = heads + DELTAS[self.direction[ids, p]]
+        self.heads[ids, p] = new_heads
+
+        shrink = ids[~grow]
+        tails = self.body[shrink, p, self.body_start[shrink, p]]
+        self.body_start[shrink, p] = (self.body_start[shrink, p] + 1) % self.cells
+        self.body_length[shrink, p] -= 1
+        self.counts[shrink, p, tails] -= 1
+
+        self.repaint(ids, cells)
+        self.repaint(shrink, tails)
+        visible = self.on_grid(new_heads)
+        self.repaint(ids[visible], self.cell_of(new_heads)[visible])
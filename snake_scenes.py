@@ -0,0 +1,368 @@
+import pygame
+import random
+import bots
+import palette
+import snake
+import surfaces
+import scenes
+
+# who plays the party mode: "human", or the name of a snake_multi bot policy
+PARTY_SLOTS = ["human", "human", "greedy", "greedy", "greedy", "survivor", "survivor", "survivor"]
+
+# human controls in up, right, down, left order, handed out in this order
+CONTROL_MAPS = [[pygame.K_UP, pygame.K_RIGHT, pygame.K_DOWN, pygame.K_LEFT],
+                [pygame.K_w, pygame.K_d, pygame.K_s, pygame.K_a],
+                [pygame.K_i, pygame.K_l, pygame.K_k, pygame.K_j],
+                [pygame.K_KP8, pygame.K_KP6, pygame.K_KP5, pygame.K_KP4]]
+
+
+class SnakeMain(scenes.Menu):
+    def __init__(self, data):
+        super().__init__(data)
+        self.text = ["SNAKE"]
+        self.text_color = palette.GREEN
+        self.setup_ui()
+    
+    def setup_ui(self):
+        self.add_text()
+        self.add_button("Slow", self.speed_signal(20, 0), (3, 0, 6, 4))
+        self.add_button("Medium", self.speed_signal(40, 1), (3, 1, 6, 4))
+        self.add_button("Fast", self.speed_signal(70, 2), (3, 2, 6, 4))
+        self.add_button("1p", self.start_game_signal("1p"), (4, 0, 6, 5))
+        self.add_button("2p", self.start_game_signal("2p"), (4, 1, 6, 5))
+        self.add_button(f"{len(PARTY_SLOTS)}p", self.start_game_signal("party"), (4, 2, 6, 5))
+        self.add_button("Back", self.back_signal, (4, 3, 6, 5))
+        
+        self.buttons[1].clicked()
+
+    def speed_signal(self, fps, num):
+        def signal():
+            self.fps = fps
+            self.buttons[num].button_color = palette.GREEN
+            whites = [0, 1, 2]
+            whites.remove(num)
+            for white in whites:
+                self.buttons[white].button_color = palette.WHITE
+
+        return signal
+    
+    def start_game_signal(self, mode):
+        if mode == "1p":
+            name = "snake_single"
+            game = SnakeSingle
+        elif mode == "2p":
+            name = "snake_double"
+            game = SnakeDouble
+        elif mode == "party":
+            name = "snake_party"
+            game = SnakeParty
+
+        def signal():
+            if mode == "party":
+                return (name, game, (self.fps, PARTY_SLOTS))
+            return (name, game, self.fps)
+
+        return signal
+        
+
+class SnakeSingle(scenes.GameScene):
+    def __init__(self, data):
+        super().__init__(data)
+        self.fps = self.data
+        self.block_size = 20
+        self.food_count = 1
+        self.dirty_rendering = True
+        self.input_width = 1
+        
+        self.setup_game()
+    
+    def setup_game(self):
+        # reset
+        window = pygame.display.get_surface()
+        window_width = window.get_width()
+        window_height = window.get_height()
+
+        self.game = snake.SingleGame(window_width, window_height, self.block_size, 
+                                     self.food_count, rng=random.Random(self.seed()))
+        self.objects = self.game.objects
+
+        # keys checked in order, first one held wins
+        self.controls = [((pygame.K_UP, pygame.K_w), pygame.K_UP),
+                         ((pygame.K_DOWN, pygame.K_s), pygame.K_DOWN),
+                         ((pygame.K_LEFT, pygame.K_a), pygame.K_LEFT),
+                         ((pygame.K_RIGHT, pygame.K_d), pygame.K_RIGHT)]
+
+    def process_frame(self):
+        for event in pygame.event.get():
+            self.check_quit(event)
+
+        key_list = pygame.key.get_pressed()
+        direction = None
+        for keys, key_direction in self.controls:
+            if key_list[keys[0]] or key_list[keys[1]]:
+                direction = key_direction
+                break
+
+        if self.play(direction):
+            return self.lose()
+
+    def simulate(self, direction):
+        return self.game.step(direction)
+
+    def encode_inputs(self, direction):
+        return (snake.DIRECTION_CODES.index(direction),)
+
+    def decode_inputs(self, codes):
+        return snake.DIRECTION_CODES[codes[0]]
+
+    def lose(self):
+        return ("snake_end", SnakeEnd, self.game.score, True)
+
+
+class SnakeDouble(scenes.GameScene):
+    def __init__(self, data):
+        super().__init__(data)
+        self.fps = self.data
+        self.block_size = 20
+        self.food_count = 1
+        self.dirty_rendering = True
+        self.input_width = 2
+
+        self.countdown = True
+        self.countdown_text = [["Ready"], ["Go!"]]
+        self.countdown_length = 120
+        # the last round's winner, once simulate reports the round over
+        self.winner = None
+
+        self.setup_game()
+    
+    def setup_game(self):
+        window = pygame.display.get_surface()
+        window_width = window.get_width()
+        window_height = window.get_height()
+
+        self.game = self.make_game(window_width, window_height)
+        self.objects = self.game.objects
+
+        # up, right, down, left; keys checked in that order
+        self.directions = [pygame.K_UP, pygame.K_RIGHT, pygame.K_DOWN, pygame.K_LEFT]
+        self.p1_controls = [pygame.K_w, pygame.K_d, pygame.K_s, pygame.K_a]
+        self.p2_controls = [pygame.K_UP, pygame.K_RIGHT, pygame.K_DOWN, pygame.K_LEFT]
+
+    def make_game(self, width, height):
+        return snake.DoubleGame(width, height, self.block_size, self.food_count,
+                                rng=random.Random(self.seed()))
+
+    def process_frame(self):
+        self.replay_snapshot()
+
+        if self.game.finished():
+            return self.match()
+
+        if self.countdown:
+            back = ("snake_double", SnakeDouble, self.data, True)
+            self.countdown = False
+            return ("countdown", scenes.Countdown, (self.surface_snapshot(), self.countdown_text, 
+                    self.countdown_length, back))
+
+        for event in pygame.event.get():
+            self.check_quit(event)
+
+        # None when there is nothing to play this tick
+        directions = self.read_directions()
+        if directions is None:
+            return None
+
+        if self.play(directions):
+            return self.win(self.winner)
+
+    def simulate(self, directions):
+        self.winner = self.game.step(directions)
+        return self.winner is not None
+
+    def encode_inputs(self, directions):
+        return [snake.DIRECTION_CODES.index(direction) for direction in directions]
+
+    def decode_inputs(self, codes):
+        return [snake.DIRECTION_CODES[code] for code in codes]
+
+    def read_directions(self):
+        key_list = pygame.key.get_pressed()
+        return [self.read_direction(key_list, self.p1_controls),
+                self.read_direction(key_list, self.p2_controls)]
+
+    def read_direction(self, key_list, controls):
+        for key, direction in zip(controls, self.directions):
+            if key_list[key]:
+                return direction
+        return None
+    
+    def win(self, winner):
+        self.game.win(winner)
+        if winner:
+            winner = "blue"
+        else:
+            winner = "green"
+
+        back = ("snake_double", SnakeDouble, self.data, True)
+        replay = ("replay", scenes.Replay, self.get_replay() + [back], True)
+        countdown = ("countdown", scenes.Countdown, 
+                     (self.surface_snapshot(), [[f"{winner} wins!"]], 90, replay))
+                     
+        
+        self.countdown = True
+        self.game.new_round()
+        
+        self.reset_replay()
+        
+        return countdown
+
+    def match(self):
+        p1_score, p2_score = self.game.scores
+        if p1_score > p2_score:
+            winner = "green"
+        else:
+            winner = "blue"
+        
+        surface = surfaces.borrow_window_sized()
+        surface.fill(palette.BLACK)
+        
+        line1 = [f"{winner} wins the set!"]
+        line2 = ["Final Score:", f"green {p1_score} - {p2_score} blue"]
+
+        back = ("snake_main", SnakeMain, None, True)
+        countdown = ("countdown", scenes.Countdown, (surface, [line1, line2], 120, back), True)
+
+        return countdown
+        
+
+class SnakeParty(scenes.GameScene):
+    # any mix of human and bot snakes on one board; data is (fps, slots)
+    def __init__(self, data):
+        super().__init__(data)
+        self.fps, self.slots = self.data
+        self.block_size = 20
+        self.food_count = max(1, len(self.slots) // 2)
+        self.dirty_rendering = True
+
+        self.countdown = True
+        self.countdown_text = [["Ready"], ["Go!"]]
+        self.countdown_length = 120
+
+        self.setup_game()
+
+    def setup_game(self):
+        window = pygame.display.get_surface()
+        window_width = window.get_width()
+        window_height = window.get_height()
+
+        self.game = snake.MultiGame(window_width, window_height, self.block_size, 
+                                    len(self.slots), self.food_count,
+                                    rng=random.Random(self.seed()))
+        self.objects = self.game.objects
+
+        self.directions = [pygame.K_UP, pygame.K_RIGHT, pygame.K_DOWN, pygame.K_LEFT]
+        self.controls = {}
+        self.policies = {}
+        humans = 0
+        for i, slot in enumerate(self.slots):
+            if slot == "human":
+                self.controls[i] = CONTROL_MAPS[humans]
+                humans += 1
+            else:
+                self.policies[i] = bots.get_policy("snake_multi", slot)
+
+    def process_frame(self):
+        self.replay_snapshot()
+
+        if self.game.finished():
+            return self.match()
+
+        if self.countdown:
+            back = ("snake_party", SnakeParty, self.data, True)
+            self.countdown = False
+            return ("countdown", scenes.Countdown, (self.surface_snapshot(), self.countdown_text, 
+                    self.countdown_length, back))
+
+        for event in pygame.event.get():
+            self.check_quit(event)
+
+        key_list = pygame.key.get_pressed()
+        directions = []
+        for i in range(len(self.slots)):
+            if not self.game.alive[i]:
+                directions.append(None)
+            elif i in self.controls:
+                directions.append(self.read_direction(key_list, self.controls[i]))
+            else:
+                directions.append(self.policies[i](self.game, i, random))
+
+        if self.play(directions):
+            return self.win(self.winner)
+
+    def simulate(self, directions):
+        self.winner = self.game.step(directions)
+        return self.winner is not None
+
+    def read_direction(self, key_list, controls):
+        for key, direction in zip(controls, self.directions):
+            if key_list[key]:
+                return direction
+        return None
+
+    def win(self, winner):
+        self.game.win(winner)
+        if winner == snake.DRAW:
+            message = "nobody wins!"
+        else:
+            message = f"player {winner + 1} wins!"
+
+        back = ("snake_party", SnakeParty, self.data, True)
+        replay = ("replay", scenes.Replay, self.get_replay() + [back], True)
+        countdown = ("countdown", scenes.Countdown, 
+                     (self.surface_snapshot(), [[message]], 90, replay))
+
+        self.countdown = True
+        self.game.new_round()
+
+        self.reset_replay()
+
+        return countdown
+
+    def match(self):
+        scores = self.game.scores
+        winner = scores.index(max(scores))
+
+        surface = surfaces.borrow_window_sized()
+        surface.fill(palette.BLACK)
+
+        # four players to a line
+        results = [f"p{i + 1} {score}" for i, score in enumerate(scores)]
+        lines = ["  ".join(results[i:i + 4]) for i in range(0, len(results), 4)]
+        line1 = [f"player {winner + 1} wins the set!"]
+        line2 = ["Final Score:"] + lines
+
+        back = ("snake_main", SnakeMain, None, True)
+        countdown = ("countdown", scenes.Countdown, (surface, [line1, line2], 120, back), True)
+
+        return countdown
+
+
+class SnakeEnd(scenes.Menu):
+    def __init__(self, data):
+        super().__init__(data)
+        self.text = ["LOSER!", f"Score: {self.data}", "Press ENTER to continue"]
+        self.text_color = palette.WHITE
+
+        self.setup_ui()
+
+    def setup_ui(self):
+        self.add_text()
+    
+    def process_frame(self):
+        for event in pygame.event.get():
+            self.check_quit(event)
+            
+            if event.type == pygame.KEYUP:
+                if event.key == pygame.K_RETURN:
+                    return ("snake_main", SnakeMain, None, True)
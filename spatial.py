@@ -0,0 +1,105 @@
+import math
+import pygame
+
+SPATIAL_CELL_SIZE = 64
+
+
+def covering_rect(x, y, width, height):
+    # the smallest whole pixel rect around a rect with float corners
+    left = math.floor(x)
+    top = math.floor(y)
+    return pygame.rect.Rect(left, top, math.ceil(x + width) - left, math.ceil(y + height) - top)
+
+
+class SpatialHash:
+    # uniform grid of buckets; an object sits in the bucket of every cell its rect
+    # touches, so a query only looks at objects near the rect it is given
+    def __init__(self, cell_size=SPATIAL_CELL_SIZE):
+        self.cell_size = cell_size
+        self.buckets = {}
+
+        self.rects = {}
+        self.cells = {}
+        # insertion numbers, so queries return objects in a stable order
+        self.order = {}
+        self.added = 0
+
+    def __len__(self):
+        return len(self.rects)
+
+    def __contains__(self, obj):
+        return obj in self.rects
+
+    def cells_for(self, rect):
+        size = self.cell_size
+        left = rect.left // size
+        right = (rect.right - 1) // size
+        top = rect.top // size
+        bottom = (rect.bottom - 1) // size
+        return tuple((col, row) for col in range(left, right + 1)
+                     for row in range(top, bottom + 1))
+
+    def insert(self, obj, rect):
+        if obj in self.rects:
+            self.move(obj, rect)
+            return
+
+        self.rects[obj] = rect
+        self.order[obj] = self.added
+        self.added += 1
+
+        cells = self.cells_for(rect)
+        self.cells[obj] = cells
+        for cell in cells:
+            self.buckets.setdefault(cell, {})[obj] = None
+
+    def move(self, obj, rect):
+        self.rects[obj] = rect
+
+        # most moves stay within the same cells
+        cells = self.cells_for(rect)
+        old = self.cells[obj]
+        if cells == old:
+            return
+
+        self.cells[obj] = cells
+        for cell in old:
+            self.unlink(cell, obj)
+        for cell in cells:
+            self.buckets.setdefault(cell, {})[obj] = None
+
+    def remove(self, obj):
+        if obj not in self.rects:
+            return
+
+        for cell in self.cells.pop(obj):
+            self.unlink(cell, obj)
+        del self.rects[obj]
+        del self.order[obj]
+
+    def unlink(self, cell, obj):
+        bucket = self.buckets[cell]
+        del bucket[obj]
+        if not bucket:
+            del self.buckets[cell]
+
+    def clear(self):
+        self.buckets.clear()
+        self.rects.clear()
+        self.cells.clear()
+        self.order.clear()
+
+    def query(self, rect):
+        # objects whose rect overlaps rect, in the order they were inserted
+        found = {}
+        for cell in self.cells_for(rect):
+            bucket = self.buckets.get(cell)
+            if bucket is None:
+                continue
+            for obj in bucket:
+                if obj not in found and self.rects[obj].colliderect(rect):
+                    found[obj] = None
+
+        if len(found) < 2:
+            return list(found)
+        return sorted(found, key=self.order.__getitem__)
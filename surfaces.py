@@ -0,0 +1,43 @@
+import pygame
+
+
+class SurfacePool:
+    def __init__(self, max_free=4):
+        self.max_free = max_free
+        # free surfaces, least recently returned first
+        self.free = []
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def borrow(self, size):
+        size = tuple(size)
+        for i in range(len(self.free) - 1, -1, -1):
+            if self.free[i].get_size() == size:
+                self.hits += 1
+                return self.free.pop(i)
+
+        self.misses += 1
+        return pygame.surface.Surface(size)
+
+    def give_back(self, surface):
+        for free in self.free:
+            if free is surface:
+                return
+
+        self.free.append(surface)
+        if len(self.free) > self.max_free:
+            self.free.pop(0)
+            self.evictions += 1
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, 
+                "evictions": self.evictions, "free": len(self.free)}
+
+
+pool = SurfacePool()
+
+
+def borrow_window_sized():
+    return pool.borrow(pygame.display.get_surface().get_size())
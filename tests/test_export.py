@@ -0,0 +1,50 @@
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+pygame.display.init()
+pygame.font.init()
+pygame.display.set_mode((1300, 800))
+
+import scenes
+import snake_scenes
+
+DONE = ("done", None, None)
+
+
+def recorded_replay(frames):
+    # a snake scene's state replay after frames ticks
+    random.seed(0)
+    scene = snake_scenes.SnakeDouble(60)
+    for tick in range(frames):
+        scene.replay_snapshot()
+        if scene.game.step([None, None]) is not None:
+            scene.game.new_round()
+    return scene.get_replay()
+
+
+def test_export_writes_every_frame(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    replay, pointer = recorded_replay(40)
+    scene = scenes.Replay((replay, pointer, DONE))
+    scene.start_export("png")
+
+    deadline = time.monotonic() + 60
+    try:
+        while scene.process_frame() is None:
+            assert time.monotonic() < deadline, scene.export.status()
+            time.sleep(0.005)
+    finally:
+        # a failed run would otherwise leave the encoder waiting on its queue
+        scene.export.process.terminate()
+
+    # the first frame through the last, both included
+    assert scene.export.error is None
+    assert scene.export.encoded == scene.length + 1
+    assert len(os.listdir(scene.export.path)) == scene.length + 1
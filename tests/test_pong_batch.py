@@ -0,0 +1,46 @@
+import os
+import random
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+import pong
+import pong_batch
+
+WIDTH = 1300
+HEIGHT = 800
+
+
+def first_divergence(count, ticks, ball_speed, seed=0):
+    # steps count scalar games and one batch on the same random paddle moves;
+    # returns the first (tick, game) whose paddles or ball differ, or None
+    games = [pong.PongGame(WIDTH, HEIGHT, win_score=10 ** 9, rng=random.Random(seed + i),
+                           ball_speed=ball_speed) for i in range(count)]
+    batch = pong_batch.BatchPong(count, WIDTH, HEIGHT, win_score=10 ** 9, seed=seed,
+                                 ball_speed=ball_speed)
+    batch.reset(serve=[1 if game.ball.direction[0] > 0 else -1 for game in games])
+
+    moves = np.random.default_rng(seed)
+    for tick in range(ticks):
+        left_moves = moves.integers(-1, 2, count)
+        right_moves = moves.integers(-1, 2, count)
+        batch.step(left_moves, right_moves)
+        for i, game in enumerate(games):
+            game.step(int(left_moves[i]), int(right_moves[i]))
+            if ((game.ball.x, game.ball.y) != (batch.ball_x[i], batch.ball_y[i]) or
+                    game.left.pos[1] != batch.left_y[i] or
+                    game.right.pos[1] != batch.right_y[i] or
+                    (game.score_left, game.score_right) !=
+                    (batch.score_left[i], batch.score_right[i])):
+                return tick, i
+    return None
+
+
+@pytest.mark.parametrize("ball_speed", [15, 60])
+def test_batch_follows_scalar_game(ball_speed):
+    # fast balls make grazing paddle contacts common
+    assert first_divergence(200, 1000, ball_speed) is None
@@ -0,0 +1,52 @@
+import os
+import random
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+pygame.display.init()
+pygame.font.init()
+pygame.display.set_mode((1300, 800))
+
+import replays
+import snake_scenes
+import surfaces
+
+
+class PixelSnakeDouble(snake_scenes.SnakeDouble):
+    # chooses pixel replays after the base scene is set up, as scenes do
+    def __init__(self, data):
+        super().__init__(data)
+        self.replay_mode = "pixels"
+
+
+def test_pixel_replay_decodes_every_frame():
+    random.seed(0)
+    scene = PixelSnakeDouble(60)
+    scene.replay_size = 90
+    moves = random.Random(1)
+
+    expected = {}
+    for tick in range(120):
+        pointer = scene.replay_pointer
+        scene.replay_snapshot()
+        surface = scene.surface_snapshot()
+        expected[pointer] = pygame.image.tobytes(surface, "RGB")
+        surfaces.pool.give_back(surface)
+        directions = [moves.choice([None, pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT,
+                                    pygame.K_RIGHT]) for i in range(2)]
+        if scene.game.step(directions) is not None:
+            scene.game.new_round()
+
+    replay, pointer = scene.get_replay()
+    assert isinstance(replay, replays.PixelReplay)
+
+    # out of order, so frames are reached from keyframes and from each other
+    order = [index for index in range(len(replay)) if replay.has_frame(index)]
+    assert len(order) > 60
+    random.Random(2).shuffle(order)
+    for index in order:
+        assert pygame.image.tobytes(replay[index], "RGB") == expected[index]
@@ -0,0 +1,163 @@
+import argparse
+import concurrent.futures
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+ARENA = (1300, 800)
+SNAKE_BLOCK_SIZE = 20
+
+
+def init_worker():
+    # no window in the workers
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+
+def play_pong(policies, rng, max_ticks):
+    import pong
+
+    game = pong.PongGame(*ARENA, rng=rng)
+    ticks = 0
+    while not game.finished() and ticks < max_ticks:
+        game.step(policies[0](game, 0, rng), policies[1](game, 1, rng))
+        ticks += 1
+
+    scores = [game.score_left, game.score_right]
+    return scores, ticks
+
+
+def play_snake(policies, rng, max_ticks):
+    import snake
+
+    game = snake.DoubleGame(*ARENA, SNAKE_BLOCK_SIZE, rng=rng)
+    ticks = 0
+    while not game.finished() and ticks < max_ticks:
+        directions = [policies[0](game, 0, rng), policies[1](game, 1, rng)]
+        winner = game.step(directions)
+        if winner is not None:
+            game.win(winner)
+            if not game.finished():
+                game.new_round()
+        ticks += 1
+
+    return list(game.scores), ticks
+
+
+GAMES = {"pong": play_pong, "snake": play_snake}
+
+
+def play_chunk(game_name, names, jobs, max_ticks):
+    # jobs are (match number, seed, swapped); runs in a worker process
+    import bots
+
+    play = GAMES[game_name]
+    results = []
+    for number, seed, swapped in jobs:
+        seats = [names[1], names[0]] if swapped else list(names)
+        policies = [bots.get_policy(game_name, name) for name in seats]
+
+        start = time.perf_counter()
+        scores, ticks = play(policies, random.Random(seed), max_ticks)
+        seconds = time.perf_counter() - start
+
+        if scores[0] == scores[1]:
+            winner = None
+        else:
+            winner = seats[0] if scores[0] > scores[1] else seats[1]
+        results.append({"match": number, "seed": seed, "seats": seats, "scores": scores,
+                        "winner": winner, "ticks": ticks, "seconds": seconds})
+    return results
+
+
+class Standings:
+    def __init__(self, names):
+        self.names = names
+        self.wins = {name: 0 for name in names}
+        self.draws = 0
+        self.lengths = []
+        self.ticks = 0
+        self.seconds = 0
+
+    def add(self, result):
+        if result["winner"] is None:
+            self.draws += 1
+        else:
+            self.wins[result["winner"]] += 1
+        self.lengths.append(result["ticks"])
+        self.ticks += result["ticks"]
+        self.seconds += result["seconds"]
+
+    def summary(self, wall_time):
+        played = len(self.lengths)
+        return {
+            "matches": played,
+            "win_rate": {name: self.wins[name] / played for name in self.names} if played else {},
+            "draws": self.draws,
+            "mean_ticks": statistics.mean(self.lengths) if played else 0,
+            "median_ticks": statistics.median(self.lengths) if played else 0,
+            "ticks_per_second": self.ticks / wall_time if wall_time else 0,
+            "ticks_per_worker_second": self.ticks / self.seconds if self.seconds else 0,
+        }
+
+
+def chunks(matches, seed, chunk_size):
+    # alternate seats so neither policy keeps the first move
+    jobs = [(number, seed + number, number % 2 == 1) for number in range(matches)]
+    for i in range(0, len(jobs), chunk_size):
+        yield jobs[i:i + chunk_size]
+
+
+def run(game, names, matches, workers, chunk_size, seed, max_ticks, progress=None):
+    standings = Standings(names)
+    start = time.perf_counter()
+
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=init_worker) as pool:
+        futures = [pool.submit(play_chunk, game, names, jobs, max_ticks)
+                   for jobs in chunks(matches, seed, chunk_size)]
+        for future in concurrent.futures.as_completed(futures):
+            for result in future.result():
+                standings.add(result)
+            if progress is not None:
+                progress(standings.summary(time.perf_counter() - start))
+
+    return standings.summary(time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play headless bot matches on all cores.")
+    parser.add_argument("game", choices=sorted(GAMES))
+    parser.add_argument("policy_a", help="built-in policy name or module:function")
+    parser.add_argument("policy_b", help="built-in policy name or module:function")
+    parser.add_argument("--matches", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk", type=int, default=10, help="matches per task")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-ticks", type=int, default=100000,
+                        help="matches still going after this many ticks are scored as they stand")
+    parser.add_argument("--json", help="write the summary to this file")
+    args = parser.parse_args(argv)
+
+    if args.policy_a == args.policy_b:
+        parser.error("policies need different names; wrap one as module:function to self-play")
+
+    def progress(summary):
+        rates = " ".join(f"{name} {rate:.1%}" for name, rate in summary["win_rate"].items())
+        print(f"\r{summary['matches']}/{args.matches} {rates} "
+              f"{summary['ticks_per_second']:.0f} ticks/s", end="", file=sys.stderr)
+
+    summary = run(args.game, [args.policy_a, args.policy_b], args.matches, args.workers,
+                  args.chunk, args.seed, args.max_ticks, progress)
+    print(file=sys.stderr)
+    print(json.dumps(summary, indent=2))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()